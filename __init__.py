@@ -15,7 +15,7 @@
 
 import bpy
 from bpy_extras.io_utils import ImportHelper
-from bpy.props import StringProperty, BoolProperty, EnumProperty
+from bpy.props import StringProperty, BoolProperty, EnumProperty, IntProperty
 from bpy.types import Operator
 
 
@@ -34,6 +34,92 @@ class NupImport(Operator, ImportHelper):
         maxlen=255,  # Max internal buffer length, longer would be clamped.
     )
 
+    cache_dir: StringProperty(
+        name="Cache Directory",
+        description="Directory for cached import data. If empty, the extension's user directory is used",
+        subtype="DIR_PATH",
+        default="",
+    )
+
+    use_scene_cache: BoolProperty(
+        name="Cache Parsed Scenes",
+        description="Store parsed scenes on disk and reuse them when the same file is imported again",
+        default=False,
+    )
+
+    scene_cache_size: IntProperty(
+        name="Scene Cache Size (MB)",
+        description="Size limit of the parsed scene cache. The least recently used scenes are removed first",
+        default=1024,
+        min=1,
+    )
+
+    texture_mode: EnumProperty(
+        name="Textures",
+        description="How textures are brought into Blender",
+        items=(
+            ("DECODE", "Decode", "Decode textures and pack them as PNG images"),
+            (
+                "DDS",
+                "DDS Files",
+                "Write compressed textures as DDS files to a directory per scene, for Blender to load",
+            ),
+            (
+                "DDS_PACKED",
+                "Packed DDS",
+                "Pack compressed textures as DDS files, for Blender to load",
+            ),
+        ),
+        default="DECODE",
+    )
+
+    use_texture_cache: BoolProperty(
+        name="Cache Decoded Textures",
+        description="Store decoded textures on disk and reuse them in any scene with the same texture",
+        default=False,
+    )
+
+    texture_cache_size: IntProperty(
+        name="Texture Cache Size (MB)",
+        description="Size limit of the decoded texture cache. The least recently used textures are removed first",
+        default=2048,
+        min=1,
+    )
+
+    texture_level: IntProperty(
+        name="Texture Mip Level",
+        description="Mip level to import textures at. Level 0 is full resolution, and each level halves the width and height",
+        default=0,
+        min=0,
+    )
+
+    max_texture_size: IntProperty(
+        name="Max Texture Size",
+        description="Import textures at the first mip level with neither dimension over this size. 0 for no limit",
+        default=0,
+        min=0,
+    )
+
+    texture_workers: IntProperty(
+        name="Texture Decode Threads",
+        description="Number of threads decoding textures. 0 uses one per CPU",
+        default=0,
+        min=0,
+    )
+
+    texture_memory_limit: IntProperty(
+        name="Texture Memory Limit (MB)",
+        description="How much memory decoded textures may take up at once, including the float pixels of the image being created. 0 for no limit",
+        default=512,
+        min=0,
+    )
+
+    use_compact_attributes: BoolProperty(
+        name="Compact Mesh Attributes",
+        description="Store vertex colors and UVs once per vertex rather than once per face corner. UVs are then a generic attribute, read by the materials, rather than a UV map",
+        default=False,
+    )
+
     def execute(self, context):        
         from .plugins.DdsImagePlugin import DXT1Decoder, DXT5Decoder
         from PIL import Image
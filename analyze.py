@@ -3,6 +3,7 @@ import os
 
 from files.nu import NuPlatform
 from files.nup import Nup
+from files.read import map_file
 
 
 def main():
@@ -31,39 +32,38 @@ def main():
             case _:
                 nup_platform = None
 
-        with open(nup_path, "rb") as file:
-            data = file.read()
+        # Only the materials section is decoded.
+        try:
+            materials = Nup(map_file(nup_path), platform=nup_platform).materials
+        except:
+            print("Failed to parse: {}".format(nup_name))
+            continue
+
+        for i, material in enumerate(materials):
             try:
-                nup = Nup(data, platform=nup_platform)
+                alpha_mode = material.alpha_mode()
+                alpha_test = material.alpha_test()
+                colour = material.colour()
+                effect_id = material.effect_id
+                lighting = material.lighting()
             except:
-                print("Failed to parse: {}".format(nup_name))
+                print("Failed to analyze material #{} in: {}".format(i, nup_name))
                 continue
 
-            for i, material in enumerate(nup.materials):
-                try:
-                    alpha_mode = material.alpha_mode()
-                    alpha_test = material.alpha_test()
-                    colour = material.colour()
-                    effect_id = material.effect_id
-                    lighting = material.lighting()
-                except:
-                    print("Failed to analyze material #{} in: {}".format(i, nup_name))
-                    continue
-
-                alpha_modes.setdefault(alpha_mode, 0)
-                alpha_modes[alpha_mode] += 1
+            alpha_modes.setdefault(alpha_mode, 0)
+            alpha_modes[alpha_mode] += 1
 
-                alpha_tests.setdefault(alpha_test, 0)
-                alpha_tests[alpha_test] += 1
+            alpha_tests.setdefault(alpha_test, 0)
+            alpha_tests[alpha_test] += 1
 
-                colours.setdefault(colour, 0)
-                colours[colour] += 1
+            colours.setdefault(colour, 0)
+            colours[colour] += 1
 
-                effect_ids.setdefault(effect_id, 0)
-                effect_ids[effect_id] += 1
+            effect_ids.setdefault(effect_id, 0)
+            effect_ids[effect_id] += 1
 
-                lightings.setdefault(lighting, 0)
-                lightings[lighting] += 1
+            lightings.setdefault(lighting, 0)
+            lightings[lighting] += 1
 
     print("attrib.alpha: {}".format(alpha_modes))
     print("attrib.colour: {}".format(colours))
@@ -0,0 +1,423 @@
+import argparse
+import importlib.util
+import os
+import random
+import struct
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from files.nu import NuAnimKey, NuColour3, NuColour32, NuMtx, NuVec
+from files.ter import NuTer
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="nu-benchmark")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    records_parser = subparsers.add_parser(
+        "records", help="memory used per instance of high-cardinality records"
+    )
+    records_parser.add_argument("--count", type=int, default=100000)
+
+    pixels_parser = subparsers.add_parser(
+        "pixels",
+        help="converting decoded pixels for an image, and uploading them when run "
+        "in Blender",
+    )
+    pixels_parser.add_argument("--size", type=int, default=1024)
+
+    dxt_parser = subparsers.add_parser(
+        "dxt",
+        help="decoding DXT1 and DXT5 with Pillow's C decoder and with the plugin "
+        "fallback, and comparing their output",
+    )
+    dxt_parser.add_argument("--size", type=int, default=1024)
+
+    mesh_parser = subparsers.add_parser(
+        "mesh",
+        help="building a mesh with bmesh and from arrays, and comparing the "
+        "results; needs Blender",
+    )
+    mesh_parser.add_argument("--geoms", type=int, default=50)
+    mesh_parser.add_argument("--size", type=int, default=32)
+
+    attributes_parser = subparsers.add_parser(
+        "attributes",
+        help="size of a scene's meshes with per-corner and compact colours and "
+        "UVs, in memory and saved; needs Blender",
+    )
+    attributes_parser.add_argument("scene", help="path to a .nup or .nux file")
+
+    # When run with `blender --background --python benchmark.py -- ...`, only
+    # the arguments after "--" are ours.
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else None
+    args = parser.parse_args(argv)
+
+    match args.benchmark:
+        case "records":
+            bench_records(args.count)
+        case "pixels":
+            bench_pixels(args.size)
+        case "dxt":
+            bench_dxt(args.size)
+        case "mesh":
+            bench_mesh(args.geoms, args.size)
+        case "attributes":
+            bench_attributes(args.scene)
+
+
+def bench_records(count):
+    # Random floats throughout, but keep the second terrain normal in range so
+    # that each NuTer is read as a quad.
+    ter_data = bytearray(random_data(NuTer.SIZE))
+    struct.pack_into("<f", ter_data, 0x58, 1.0)
+
+    records = [
+        (NuVec, random_data(NuVec.SIZE)),
+        (NuColour3, random_data(NuColour3.SIZE)),
+        (NuColour32, random_data(0x04)),
+        (NuAnimKey, random_data(NuAnimKey.SIZE)),
+        (NuMtx, random_data(NuMtx.SIZE)),
+        (NuTer, bytes(ter_data)),
+    ]
+
+    print("{:<12} {:>14}".format("record", "bytes/record"))
+    for cls, data in records:
+        tracemalloc.start()
+        instances = [cls(data, 0) for _ in range(count)]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Discount the list holding the instances.
+        size -= count * 8
+        del instances
+
+        print("{:<12} {:>14.1f}".format(cls.__name__, size / count))
+
+
+def bench_pixels(size):
+    textures = import_addon_module("textures")
+    pixels = os.urandom(size * size * 4)
+
+    def list_pixels():
+        return [item / 255.0 for item in pixels]
+
+    def array_pixels():
+        return textures.float_pixels(pixels)
+
+    print("{:<24} {:>10}".format("{0}x{0} pixels".format(size), "ms"))
+    print("{:<24} {:>10.1f}".format("list of floats", timed(list_pixels)))
+    print("{:<24} {:>10.1f}".format("float32 array", timed(array_pixels)))
+
+    try:
+        import bpy
+    except ImportError:
+        return
+
+    image = bpy.data.images.new("Benchmark", size, size, alpha=True)
+    float_list = list_pixels()
+    float_array = array_pixels()
+
+    def assign_list():
+        image.pixels = float_list
+
+    def assign_array():
+        image.pixels.foreach_set(float_array)
+
+    print("{:<24} {:>10.1f}".format("pixels = list", timed(assign_list)))
+    print("{:<24} {:>10.1f}".format("pixels.foreach_set", timed(assign_array)))
+
+    bpy.data.images.remove(image)
+
+
+def bench_dxt(size):
+    from PIL import Image
+
+    nu = import_addon_module("files.nu")
+    types = import_addon_module("files.types")
+    textures = import_addon_module("textures")
+    plugin = import_addon_module("plugins.DdsImagePlugin")
+
+    Image.register_decoder("DXT1", plugin.DXT1Decoder)
+    Image.register_decoder("DXT5", plugin.DXT5Decoder)
+
+    print(
+        "{:<8} {:>12} {:>12} {:>12} {:>10}".format(
+            "type", "plugin ms", "bcn ms", "identical", "max diff"
+        )
+    )
+    for texture_type in (nu.NuTextureType.DXT1, nu.NuTextureType.DXT5):
+        payload_size = types.Texture.payload_size(size, size, 1, texture_type)
+        texture = types.Texture(
+            os.urandom(payload_size), 0, payload_size, size, size, 1, texture_type
+        )
+
+        def decode_plugin():
+            return textures.decode_texture(texture, 0, use_bcn=False)
+
+        def decode_bcn():
+            return textures.decode_texture(texture, 0, use_bcn=True)
+
+        # The plugin expands 5- and 6-bit channels by shifting, where the C
+        # decoder replicates the high bits into the low bits, so the two differ
+        # by a few steps in most pixels.
+        (_, _, plugin_pixels) = decode_plugin()
+        (_, _, bcn_pixels) = decode_bcn()
+        plugin_pixels = np.frombuffer(plugin_pixels, np.uint8).reshape(-1, 4)
+        bcn_pixels = np.frombuffer(bcn_pixels, np.uint8).reshape(-1, 4)
+        identical = (plugin_pixels == bcn_pixels).all(axis=1).mean()
+        max_diff = np.abs(plugin_pixels.astype(np.int16) - bcn_pixels).max()
+
+        print(
+            "{:<8} {:>12.1f} {:>12.1f} {:>11.1%} {:>10}".format(
+                texture_type.name,
+                timed(decode_plugin),
+                timed(decode_bcn),
+                identical,
+                max_diff,
+            )
+        )
+
+
+def bench_mesh(geom_count, size):
+    from types import SimpleNamespace
+
+    try:
+        import bmesh
+        import bpy
+        import mathutils
+    except ImportError:
+        print("The mesh benchmark must be run in Blender.")
+        return
+
+    nu = import_addon_module("files.nu")
+    mesh = import_addon_module("mesh")
+
+    # Geoms of `size` by `size` vertex grids, each row of quads drawn as one
+    # triangle strip.
+    (x, y) = np.meshgrid(np.arange(size), np.arange(size))
+    positions = np.stack([x, y, np.zeros_like(x)], axis=-1).reshape(-1, 3)
+    rows = np.arange(size - 1)[:, None] * size + np.arange(size)[None, :]
+    index_buf = np.stack([rows, rows + size], axis=-1).reshape(-1)
+
+    geoms = [
+        SimpleNamespace(
+            vertex_buf=SimpleNamespace(
+                positions=positions.astype(np.float32),
+                normals=np.tile(np.float32([0.0, 0.0, 1.0]), (size * size, 1)),
+                uvs=positions[:, :2].astype(np.float32) / size,
+                colours=np.random.randint(0, 0x100, (size * size, 4), np.uint8),
+                count=size * size,
+            ),
+            prims=[
+                SimpleNamespace(
+                    type=nu.NuPrimType.NDXTRISTRIP,
+                    index_buf=index_buf.astype(np.uint16),
+                )
+            ],
+        )
+        for _ in range(geom_count)
+    ]
+
+    def build_bmesh():
+        # The importer's original construction, one bmesh call per vertex,
+        # face and loop, as it was before MeshBuilder.
+        blend_mesh = bmesh.new()
+
+        for geom in geoms:
+            base_index = len(blend_mesh.verts)
+
+            vertex_buf = geom.vertex_buf
+            for position, normal in zip(
+                vertex_buf.positions.tolist(), vertex_buf.normals.tolist()
+            ):
+                blend_vert = blend_mesh.verts.new(position)
+                blend_vert.normal = mathutils.Vector(normal)
+
+            uvs = vertex_buf.uvs.tolist()
+            colours = (vertex_buf.colours / 255.0).tolist()
+
+            blend_mesh.verts.ensure_lookup_table()
+
+            for prim in geom.prims:
+                index_buf = prim.index_buf.tolist()
+
+                should_reverse = True
+                for i in range(len(index_buf) - 2):
+                    if should_reverse:
+                        corners = [index_buf[i], index_buf[i + 2], index_buf[i + 1]]
+                    else:
+                        corners = [index_buf[i], index_buf[i + 1], index_buf[i + 2]]
+
+                    should_reverse = not should_reverse
+
+                    corners_global = [corner + base_index for corner in corners]
+
+                    if (
+                        corners[0] == corners[1]
+                        or corners[0] == corners[2]
+                        or corners[1] == corners[2]
+                    ):
+                        continue
+
+                    verts = (
+                        blend_mesh.verts[corners_global[0]],
+                        blend_mesh.verts[corners_global[1]],
+                        blend_mesh.verts[corners_global[2]],
+                    )
+                    if blend_mesh.faces.get(verts) is not None:
+                        continue
+
+                    face = blend_mesh.faces.new(verts)
+                    face.material_index = 0
+
+                    uv_layer = blend_mesh.loops.layers.uv.verify()
+                    color_layer = blend_mesh.loops.layers.color.verify()
+
+                    for i, loop in enumerate(face.loops):
+                        vert = corners[i]
+
+                        loop[uv_layer].uv[0] = uvs[vert][0]
+                        loop[uv_layer].uv[1] = uvs[vert][1]
+
+                        loop[color_layer] = colours[vert]
+
+        result = bpy.data.meshes.new("Benchmark")
+        blend_mesh.to_mesh(result)
+        blend_mesh.free()
+        return result
+
+    def build_arrays():
+        mesh_builder = mesh.MeshBuilder()
+        for geom in geoms:
+            mesh_builder.add_geom(geom, 0)
+
+        return mesh_builder.build("Benchmark", [])
+
+    def loop_vertices(result):
+        vertex_indices = np.zeros(len(result.loops), np.int32)
+        result.loops.foreach_get("vertex_index", vertex_indices)
+        return vertex_indices
+
+    def loop_uvs(result):
+        uvs = np.zeros(len(result.loops) * 2, np.float32)
+        result.uv_layers[0].data.foreach_get("uv", uvs)
+        return uvs
+
+    bmesh_result = build_bmesh()
+    arrays_result = build_arrays()
+    identical = (
+        len(bmesh_result.vertices) == len(arrays_result.vertices)
+        and len(bmesh_result.polygons) == len(arrays_result.polygons)
+        and np.array_equal(loop_vertices(bmesh_result), loop_vertices(arrays_result))
+        and np.array_equal(loop_uvs(bmesh_result), loop_uvs(arrays_result))
+    )
+
+    print(
+        "{} geoms of {} vertices, {} faces".format(
+            geom_count, size * size, len(arrays_result.polygons)
+        )
+    )
+    print("{:<24} {:>10.1f}".format("bmesh", timed(build_bmesh)))
+    print("{:<24} {:>10.1f}".format("arrays", timed(build_arrays)))
+    print("{:<24} {:>10}".format("identical", str(identical)))
+
+    for result in list(bpy.data.meshes):
+        if result.name.startswith("Benchmark"):
+            bpy.data.meshes.remove(result)
+
+
+def bench_attributes(scene):
+    import tempfile
+
+    try:
+        import bpy
+    except ImportError:
+        print("The attributes benchmark must be run in Blender.")
+        return
+
+    nup = import_addon_module("files.nup")
+    read = import_addon_module("files.read")
+    mesh = import_addon_module("mesh")
+
+    scene = nup.Nup(read.map_file(scene))
+
+    print(
+        "{:<10} {:>10} {:>10} {:>16} {:>12}".format(
+            "layout", "vertices", "corners", "attribute bytes", "saved bytes"
+        )
+    )
+    for compact in (False, True):
+        meshes = []
+        for obj in scene.scene.objects:
+            mesh_builder = mesh.MeshBuilder(compact)
+            for geom in obj.geoms:
+                mesh_builder.add_geom(geom, 0)
+
+            meshes.append(mesh_builder.build("Benchmark", []))
+
+        vertices = sum(len(result.vertices) for result in meshes)
+        corners = sum(len(result.loops) for result in meshes)
+
+        # A UV is two floats and a byte colour four bytes, per vertex or per
+        # corner.
+        attribute_bytes = (vertices if compact else corners) * (8 + 4)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "meshes.blend")
+            bpy.data.libraries.write(path, set(meshes), compress=False)
+            saved_bytes = os.path.getsize(path)
+
+        print(
+            "{:<10} {:>10} {:>10} {:>16} {:>12}".format(
+                "compact" if compact else "corner",
+                vertices,
+                corners,
+                attribute_bytes,
+                saved_bytes,
+            )
+        )
+
+        for result in meshes:
+            bpy.data.meshes.remove(result)
+
+
+def import_addon_module(name):
+    # The add-on's __init__ needs bpy, so the package is registered without
+    # running it, which lets its bpy-free modules be imported on their own.
+    package = "nu_blender"
+    if package not in sys.modules:
+        root = os.path.dirname(os.path.abspath(__file__))
+        spec = importlib.util.spec_from_file_location(
+            package,
+            os.path.join(root, "__init__.py"),
+            submodule_search_locations=[root],
+        )
+        sys.modules[package] = importlib.util.module_from_spec(spec)
+
+    return importlib.import_module("{}.{}".format(package, name))
+
+
+def timed(func, repeat=5):
+    # Best of `repeat` runs, in milliseconds.
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best * 1000
+
+
+def random_data(size):
+    return struct.pack(
+        "<{}f".format(size // 4), *(random.random() for _ in range(size // 4))
+    )
+
+
+if __name__ == "__main__":
+    main()
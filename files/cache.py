@@ -0,0 +1,665 @@
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+from array import array
+
+import numpy as np
+
+from .nu import *
+from .nup import (
+    Nup,
+    NupHeader,
+    NuInstance,
+    NuInstAnim,
+    NuObject,
+    NuPlatformException,
+    NuScene,
+    NuSpline,
+    NuVertexData,
+)
+from .read import map_file
+from .types import Texture
+
+
+class DiskCache:
+    # A directory of cached files, each named by its key, bounded in total size
+    # by evicting the least recently used entries. Entries are written to a
+    # temporary file and moved into place, so concurrent readers never see a
+    # partial entry, and an entry disappearing underneath a reader is treated
+    # as a miss. A cache may be used from several threads at once.
+    #
+    # Hits and misses are counted by subclasses through count(), once they've
+    # checked that an entry is usable.
+    #
+    # Writing an entry doesn't evict anything, since that means a scan of the
+    # whole directory. Callers call evict() once they're done writing, so a
+    # batch of entries costs a single scan.
+
+    def __init__(self, directory, max_size, suffix=".cache"):
+        self.directory = directory
+        self.max_size = max_size
+        self.suffix = suffix
+
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        # Entries are mapped rather than read, so large values can be used in
+        # place.
+        path = self.path(key)
+
+        try:
+            value = map_file(path)
+        except (OSError, ValueError):
+            return None
+
+        # Recency is tracked through the modification time.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return value
+
+    def count(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key, chunks):
+        # The value is given as a sequence of chunks, so large values don't need
+        # to be joined in memory first.
+        if sum(len(chunk) for chunk in chunks) > self.max_size:
+            return
+
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+
+            os.replace(temp_path, self.path(key))
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+            return
+
+    def evict(self):
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(self.suffix):
+                continue
+
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+        entries.sort()
+
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+
+            # Another process may have removed or still be reading the entry.
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+            total_size -= size
+
+
+class SceneCache(DiskCache):
+    # Parsed scenes are stored as a set of named arrays: the decoded vertex,
+    # index and key data, and tables of the fields of every record. Nothing is
+    # pickled, so an entry can only ever be read back as numbers, and a scene
+    # is rebuilt from them by scene_from_arrays(). On load, the arrays are views
+    # into the mapped cache entry instead of copies.
+    #
+    # Layout: header, one ENTRY per array, then each array padded to ALIGNMENT.
+    HEADER = struct.Struct("<4sII")
+    ENTRY = struct.Struct("<32s2sQQ")
+    MAGIC = b"NUPS"
+    ALIGNMENT = 0x10
+
+    # Bump whenever the arrays stored for a scene change.
+    FORMAT_VERSION = 1
+
+    # The only element types an entry may have.
+    DTYPES = {
+        b"f4": np.dtype("<f4"),
+        b"u4": np.dtype("<u4"),
+        b"i4": np.dtype("<i4"),
+        b"i8": np.dtype("<i8"),
+        b"u2": np.dtype("<u2"),
+        b"u1": np.dtype("u1"),
+    }
+
+    def __init__(self, directory, max_size):
+        super().__init__(directory, max_size, suffix=".nupcache")
+
+    def load(self, data, platform=None):
+        # Load a scene, keyed by a hash of the file contents, the fallback
+        # platform and the parser version. On a hit, the scene is restored
+        # without running any of the parsers. Returns the scene and whether it
+        # came from the cache.
+        digest = hashlib.sha256(data).hexdigest()
+        key = "{}-{}-v{}".format(
+            digest, platform.name if platform else "none", Nup.PARSER_VERSION
+        )
+
+        value = self.get(key)
+        if value is not None:
+            try:
+                nup = scene_from_arrays(self.unpack(value), data, platform)
+            except (ValueError, KeyError, IndexError, struct.error):
+                nup = None
+
+            if nup is not None:
+                self.count(True)
+                return (nup, True)
+
+        self.count(False)
+        nup = Nup(data, platform)
+
+        # Scenes whose platform can't be determined are left for the caller to
+        # report.
+        try:
+            chunks = self.pack(scene_arrays(nup))
+        except NuPlatformException:
+            return (nup, False)
+
+        self.put(key, chunks)
+        self.evict()
+
+        return (nup, False)
+
+    def pack(self, arrays):
+        chunks = [
+            SceneCache.HEADER.pack(
+                SceneCache.MAGIC, SceneCache.FORMAT_VERSION, len(arrays)
+            )
+        ]
+
+        codes = {dtype: code for (code, dtype) in SceneCache.DTYPES.items()}
+        for name, values in arrays.items():
+            (rows, columns) = values.shape if values.ndim == 2 else (len(values), 0)
+            chunks.append(
+                SceneCache.ENTRY.pack(
+                    name.encode("ascii"), codes[values.dtype], rows, columns
+                )
+            )
+
+        size = sum(map(len, chunks))
+        for values in arrays.values():
+            padding = -size % SceneCache.ALIGNMENT
+            chunks += [bytes(padding), np.ascontiguousarray(values).tobytes()]
+            size += padding + values.nbytes
+
+        return chunks
+
+    def unpack(self, value):
+        (magic, version, arrays_count) = SceneCache.HEADER.unpack_from(value, 0)
+        if magic != SceneCache.MAGIC or version != SceneCache.FORMAT_VERSION:
+            raise ValueError("not a cached scene")
+
+        entries = []
+        offset = SceneCache.HEADER.size
+        for _ in range(arrays_count):
+            entries.append(SceneCache.ENTRY.unpack_from(value, offset))
+            offset += SceneCache.ENTRY.size
+
+        arrays = {}
+        for name, code, rows, columns in entries:
+            dtype = SceneCache.DTYPES[code]
+            count = rows * max(columns, 1)
+
+            offset += -offset % SceneCache.ALIGNMENT
+            if offset + count * dtype.itemsize > len(value):
+                raise ValueError("truncated cached scene")
+
+            values = np.frombuffer(value, dtype, count, offset)
+            offset += count * dtype.itemsize
+
+            if columns != 0:
+                values = values.reshape(rows, columns)
+
+            arrays[name.rstrip(b"\0").decode("ascii")] = values
+
+        return arrays
+
+
+def scene_arrays(nup):
+    # Every decoded section of a scene as named arrays. Records are stored as
+    # rows of their fields, and variable-length lists as one array of items
+    # plus the index of each list's first item (and one past the last).
+    arrays = {}
+
+    header = nup.header
+    arrays["header"] = np.array(
+        [
+            header.texture_hdr_offset,
+            header.materials_offset,
+            header.vertex_data_offset,
+            header.scene_offset,
+            header.instances_offset,
+        ],
+        dtype="<i8",
+    )
+
+    # Raises NuPlatformException for scenes with mixed textures.
+    platform = nup.platform
+    arrays["platform"] = np.array([platform.value if platform else 0], dtype="<i8")
+
+    arrays["texture_headers"] = nup.texture_headers.view("<u4").reshape(-1, 5)
+    arrays["textures"] = np.array(
+        [
+            (
+                texture.offset,
+                texture.size,
+                texture.width,
+                texture.height,
+                texture.levels,
+                texture.type.value,
+            )
+            for texture in nup.textures
+        ],
+        dtype="<i8",
+    ).reshape(-1, 6)
+
+    materials = nup.materials
+    arrays["material_ints"] = np.array(
+        [
+            (
+                material.attributes,
+                material.effect_id,
+                -1 if material.texture_idx is None else material.texture_idx,
+            )
+            for material in materials
+        ],
+        dtype="<i8",
+    ).reshape(-1, 3)
+    arrays["material_floats"] = np.array(
+        [
+            (material.diffuse.r, material.diffuse.g, material.diffuse.b, material.alpha)
+            for material in materials
+        ],
+        dtype="<f4",
+    ).reshape(-1, 4)
+
+    scene = nup.scene
+    objects = scene.objects
+    geoms = [geom for obj in objects for geom in obj.geoms]
+    prims = [prim for geom in geoms for prim in geom.prims]
+
+    # Vertex buffers are shared between geoms, so each is stored once, and
+    # geoms and the decoded table refer to them by position.
+    vertex_bufs = nup.vertex_bufs
+    buffers = {}
+    for vertex_buf in list(vertex_bufs.decoded.values()) + [
+        geom.vertex_buf for geom in geoms
+    ]:
+        buffers.setdefault(id(vertex_buf), vertex_buf)
+    buffer_indices = {key: i for (i, key) in enumerate(buffers)}
+    buffers = list(buffers.values())
+
+    arrays["vertex_data"] = np.array(
+        [vertex_bufs.offset, vertex_bufs.count, vertex_bufs.hits, vertex_bufs.misses],
+        dtype="<i8",
+    )
+    arrays["decoded"] = np.array(
+        [
+            (i, buffer_indices[id(vertex_buf)])
+            for (i, vertex_buf) in vertex_bufs.decoded.items()
+        ],
+        dtype="<i8",
+    ).reshape(-1, 2)
+    arrays["vertex_bufs"] = np.array(
+        [vertex_buf.type.value for vertex_buf in buffers], dtype="<i8"
+    )
+    arrays["vertex_starts"] = starts(vertex_buf.count for vertex_buf in buffers)
+    arrays["positions"] = concatenate(
+        [vertex_buf.positions for vertex_buf in buffers], "<f4", 3
+    )
+    arrays["normals"] = concatenate(
+        [vertex_buf.normals for vertex_buf in buffers], "<f4", 3
+    )
+    arrays["colours"] = concatenate(
+        [vertex_buf.colours for vertex_buf in buffers], "u1", 4
+    )
+    arrays["uvs"] = concatenate([vertex_buf.uvs for vertex_buf in buffers], "<f4", 2)
+
+    arrays["scene"] = np.array(
+        [
+            scene.objects_count,
+            scene.objects_offset,
+            scene.instances_count,
+            scene.splines_count,
+            scene.splines_offset,
+            scene.anim_data_offset,
+            scene.anim_data_count,
+        ],
+        dtype="<i8",
+    )
+    arrays["object_geoms"] = starts(len(obj.geoms) for obj in objects)
+    arrays["geoms"] = np.array(
+        [(geom.material_idx, buffer_indices[id(geom.vertex_buf)]) for geom in geoms],
+        dtype="<i8",
+    ).reshape(-1, 2)
+    arrays["geom_prims"] = starts(len(geom.prims) for geom in geoms)
+    arrays["prims"] = np.array(
+        [(-1 if prim.type is None else prim.type.value, prim.count) for prim in prims],
+        dtype="<i8",
+    ).reshape(-1, 2)
+    arrays["index_starts"] = starts(len(prim.index_buf) for prim in prims)
+    arrays["indices"] = concatenate([prim.index_buf for prim in prims], "<u2")
+
+    instances = scene.instances
+    arrays["instance_ints"] = np.array(
+        [
+            (
+                instance.obj_idx,
+                instance.is_visible,
+                instance.anim is not None,
+                instance.anim.anim_idx if instance.anim else 0,
+            )
+            for instance in instances
+        ],
+        dtype="<i8",
+    ).reshape(-1, 4)
+    arrays["instance_floats"] = np.array(
+        [
+            list(instance.transform.values)
+            + (
+                list(instance.anim.mtx.values)
+                + [
+                    instance.anim.time_factor,
+                    instance.anim.time_first,
+                    instance.anim.time_interval,
+                ]
+                if instance.anim
+                else [0.0] * 19
+            )
+            for instance in instances
+        ],
+        dtype="<f4",
+    ).reshape(-1, 35)
+
+    splines = scene.splines
+    names = [spline.name.encode("utf-8") for spline in splines]
+    arrays["spline_names"] = np.frombuffer(b"".join(names), "u1")
+    arrays["spline_name_starts"] = starts(map(len, names))
+    arrays["spline_points"] = np.array(
+        [(point.x, point.y, point.z) for spline in splines for point in spline.points],
+        dtype="<f4",
+    ).reshape(-1, 3)
+    arrays["spline_starts"] = starts(len(spline.points) for spline in splines)
+
+    anim_data = scene.anim_data
+    chunks = [chunk for anim in anim_data if anim is not None for chunk in anim.chunks]
+    curvesets = [curveset for chunk in chunks for curveset in chunk.curvesets]
+
+    arrays["anim_present"] = np.array(
+        [anim is not None for anim in anim_data], dtype="u1"
+    )
+    arrays["anim_lengths"] = np.array(
+        [anim.length if anim else 0.0 for anim in anim_data], dtype="<f4"
+    )
+    arrays["anim_chunks"] = starts(
+        len(anim.chunks) if anim else 0 for anim in anim_data
+    )
+    arrays["chunk_curvesets"] = starts(len(chunk.curvesets) for chunk in chunks)
+    arrays["chunk_curves"] = starts(len(chunk.masks) for chunk in chunks)
+    arrays["chunk_keys"] = starts(len(chunk.keys) for chunk in chunks)
+    arrays["curveset_flags"] = np.array(
+        [curveset.flags for curveset in curvesets], dtype="<u4"
+    )
+    arrays["curveset_consts"] = np.array(
+        [curveset.constants.tolist() for curveset in curvesets], dtype="<f4"
+    ).reshape(-1, 9)
+    arrays["curveset_curves"] = np.array(
+        [curveset.curve_indices.tolist() for curveset in curvesets], dtype="<i4"
+    ).reshape(-1, 9)
+    arrays["masks"] = concatenate([chunk.masks for chunk in chunks], "<u4")
+    arrays["key_starts"] = concatenate([chunk.key_starts for chunk in chunks], "<i4")
+    arrays["key_counts"] = concatenate([chunk.key_counts for chunk in chunks], "<i4")
+    arrays["keys"] = concatenate(
+        [chunk.keys.view("<f4").reshape(-1, 4) for chunk in chunks], "<f4", 4
+    )
+
+    return arrays
+
+
+def scene_from_arrays(arrays, data, platform=None):
+    # Rebuild a scene from the arrays of scene_arrays(), bound to the data it
+    # was parsed from. Only constructors that don't parse are used, and the
+    # remaining records are filled in field by field.
+    nup = Nup.__new__(Nup)
+    nup.body = memoryview(data)[0x40:]
+    nup.fallback_platform = platform
+
+    nup.header = NupHeader.__new__(NupHeader)
+    (
+        nup.header.texture_hdr_offset,
+        nup.header.materials_offset,
+        nup.header.vertex_data_offset,
+        nup.header.scene_offset,
+        nup.header.instances_offset,
+    ) = arrays["header"].tolist()
+
+    (platform_value,) = arrays["platform"].tolist()
+    nup.platform = NuPlatform(platform_value) if platform_value else None
+
+    nup.texture_headers = (
+        arrays["texture_headers"].reshape(-1).view(NuTextureHeader.DTYPE)
+    )
+    nup.textures = [
+        Texture(
+            nup.body, offset, size, width, height, levels, NuTextureType(texture_type)
+        )
+        for (offset, size, width, height, levels, texture_type) in arrays[
+            "textures"
+        ].tolist()
+    ]
+
+    nup.materials = []
+    for (attributes, effect_id, texture_idx), (r, g, b, alpha) in zip(
+        arrays["material_ints"].tolist(), arrays["material_floats"].tolist()
+    ):
+        material = NuMaterial.__new__(NuMaterial)
+        material.attributes = attributes
+        material.effect_id = effect_id
+        material.diffuse = NuColour3.from_values(r, g, b)
+        material.alpha = alpha
+        if texture_idx != -1:
+            material.texture_idx = texture_idx
+
+        nup.materials.append(material)
+
+    buffers = []
+    vertex_starts = arrays["vertex_starts"].tolist()
+    for i, vertex_type in enumerate(arrays["vertex_bufs"].tolist()):
+        (start, end) = vertex_starts[i : i + 2]
+
+        vertex_buf = NuVtxBuffer.__new__(NuVtxBuffer)
+        vertex_buf.type = NuVtxType(vertex_type)
+        vertex_buf.count = end - start
+        vertex_buf.positions = arrays["positions"][start:end]
+        vertex_buf.normals = arrays["normals"][start:end]
+        vertex_buf.colours = arrays["colours"][start:end]
+        vertex_buf.uvs = arrays["uvs"][start:end]
+        buffers.append(vertex_buf)
+
+    vertex_bufs = NuVertexData.__new__(NuVertexData)
+    vertex_bufs.data = nup.body
+    (
+        vertex_bufs.offset,
+        vertex_bufs.count,
+        vertex_bufs.hits,
+        vertex_bufs.misses,
+    ) = arrays["vertex_data"].tolist()
+    vertex_bufs.decoded = {
+        i: buffers[buffer_idx] for (i, buffer_idx) in arrays["decoded"].tolist()
+    }
+    nup.vertex_bufs = vertex_bufs
+
+    scene = NuScene.__new__(NuScene)
+    scene.data = nup.body
+    scene.header = nup.header
+    scene.vertex_bufs = vertex_bufs
+    (
+        scene.objects_count,
+        scene.objects_offset,
+        scene.instances_count,
+        scene.splines_count,
+        scene.splines_offset,
+        scene.anim_data_offset,
+        scene.anim_data_count,
+    ) = arrays["scene"].tolist()
+    nup.scene = scene
+
+    prims = []
+    index_starts = arrays["index_starts"].tolist()
+    for i, (prim_type, count) in enumerate(arrays["prims"].tolist()):
+        prim = NuPrim.__new__(NuPrim)
+        prim.type = NuPrimType(prim_type) if prim_type != -1 else None
+        prim.count = count
+        prim.index_buf = arrays["indices"][index_starts[i] : index_starts[i + 1]]
+        prims.append(prim)
+
+    geoms = []
+    geom_prims = arrays["geom_prims"].tolist()
+    for i, (material_idx, buffer_idx) in enumerate(arrays["geoms"].tolist()):
+        geom = NuGeom.__new__(NuGeom)
+        geom.material_idx = material_idx
+        geom.vertex_buf = buffers[buffer_idx]
+        geom.prims = link(prims[geom_prims[i] : geom_prims[i + 1]])
+        geom.prim = geom.prims[0] if geom.prims else None
+        geoms.append(geom)
+
+    scene.objects = []
+    object_geoms = arrays["object_geoms"].tolist()
+    for i in range(len(object_geoms) - 1):
+        obj = NuObject.__new__(NuObject)
+        obj.geoms = link(geoms[object_geoms[i] : object_geoms[i + 1]])
+        if obj.geoms:
+            obj.geom = obj.geoms[0]
+
+        scene.objects.append(obj)
+
+    scene.instances = []
+    for (obj_idx, is_visible, has_anim, anim_idx), values in zip(
+        arrays["instance_ints"].tolist(), arrays["instance_floats"].tolist()
+    ):
+        instance = NuInstance.__new__(NuInstance)
+        instance.transform = NuMtx.from_values(values[0:16])
+        instance.obj_idx = obj_idx
+        instance.is_visible = bool(is_visible)
+
+        if has_anim:
+            instance.anim = NuInstAnim.__new__(NuInstAnim)
+            instance.anim.mtx = NuMtx.from_values(values[16:32])
+            (
+                instance.anim.time_factor,
+                instance.anim.time_first,
+                instance.anim.time_interval,
+            ) = values[32:35]
+            instance.anim.anim_idx = anim_idx
+
+        scene.instances.append(instance)
+
+    scene.splines = []
+    names = arrays["spline_names"].tobytes()
+    name_starts = arrays["spline_name_starts"].tolist()
+    points = arrays["spline_points"].tolist()
+    spline_starts = arrays["spline_starts"].tolist()
+    for i in range(len(spline_starts) - 1):
+        spline = NuSpline.__new__(NuSpline)
+        spline.name = names[name_starts[i] : name_starts[i + 1]].decode("utf-8")
+        spline.points = [
+            NuVec.from_values(*point)
+            for point in points[spline_starts[i] : spline_starts[i + 1]]
+        ]
+        scene.splines.append(spline)
+
+    curvesets = []
+    for flags, constants, curve_indices in zip(
+        arrays["curveset_flags"].tolist(),
+        arrays["curveset_consts"].tolist(),
+        arrays["curveset_curves"].tolist(),
+    ):
+        curveset = NuAnimCurveSet.__new__(NuAnimCurveSet)
+        curveset.flags = flags
+        curveset.has_rotation = (flags & 0x01) != 0
+        curveset.has_scale = (flags & 0x08) != 0
+        curveset.constants = array("f", constants)
+        curveset.curve_indices = array("i", curve_indices)
+        curvesets.append(curveset)
+
+    chunks = []
+    chunk_curvesets = arrays["chunk_curvesets"].tolist()
+    chunk_curves = arrays["chunk_curves"].tolist()
+    chunk_keys = arrays["chunk_keys"].tolist()
+    keys = arrays["keys"].reshape(-1).view(NuAnimKey.DTYPE)
+    for i in range(len(chunk_curvesets) - 1):
+        (curves_start, curves_end) = chunk_curves[i : i + 2]
+
+        chunk = NuAnimDataChunk.__new__(NuAnimDataChunk)
+        chunk.curvesets = curvesets[chunk_curvesets[i] : chunk_curvesets[i + 1]]
+        chunk.masks = arrays["masks"][curves_start:curves_end]
+        chunk.key_starts = arrays["key_starts"][curves_start:curves_end]
+        chunk.key_counts = arrays["key_counts"][curves_start:curves_end]
+        chunk.keys = keys[chunk_keys[i] : chunk_keys[i + 1]]
+        chunks.append(chunk)
+
+    scene.anim_data = []
+    anim_chunks = arrays["anim_chunks"].tolist()
+    for i, (present, length) in enumerate(
+        zip(arrays["anim_present"].tolist(), arrays["anim_lengths"].tolist())
+    ):
+        if not present:
+            scene.anim_data.append(None)
+            continue
+
+        anim = NuAnimData.__new__(NuAnimData)
+        anim.length = length
+        anim.chunks = chunks[anim_chunks[i] : anim_chunks[i + 1]]
+        scene.anim_data.append(anim)
+
+    return nup
+
+
+def starts(counts):
+    # The index of the first item of each list, followed by the total.
+    return np.concatenate(([0], np.cumsum(list(counts), dtype="<i8"))).astype("<i8")
+
+
+def concatenate(arrays, dtype, columns=0):
+    shape = (0, columns) if columns else (0,)
+    return np.concatenate([np.empty(shape, dtype)] + arrays).astype(dtype, copy=False)
+
+
+def link(records):
+    # Restore the `next` links of a chain read by read_chain().
+    for record, next_record in zip(records, records[1:]):
+        record.next = next_record
+
+    return records
@@ -0,0 +1,145 @@
+import struct
+
+import numpy as np
+
+from .read import *
+
+
+class DdsHeader:
+    # The 128-byte header of a DDS file, including the magic number. Only the
+    # fields needed to locate block-compressed mip levels are read.
+    SIZE = 0x80
+
+    MAGIC = b"DDS "
+
+    SCHEMA = Schema(
+        ("magic", 0x00, "4s"),
+        ("height", 0x0C, "I"),
+        ("width", 0x10, "I"),
+        ("levels", 0x1C, "I"),
+        ("pixel_format_flags", 0x50, "I"),
+        ("four_cc", 0x54, "4s"),
+    )
+
+    # Bytes per 4x4 block of the block-compressed formats.
+    BLOCK_SIZES = {b"DXT1": 0x08, b"DXT3": 0x10, b"DXT5": 0x10}
+
+    # Header flags.
+    DDSD_CAPS = 0x01
+    DDSD_HEIGHT = 0x02
+    DDSD_WIDTH = 0x04
+    DDSD_PIXELFORMAT = 0x1000
+    DDSD_MIPMAPCOUNT = 0x20000
+    DDSD_LINEARSIZE = 0x80000
+
+    # Pixel format flags.
+    DDPF_FOURCC = 0x04
+
+    # Capability flags.
+    DDSCAPS_COMPLEX = 0x08
+    DDSCAPS_TEXTURE = 0x1000
+    DDSCAPS_MIPMAP = 0x400000
+
+    def __init__(self, data, offset=0):
+        if len(data) - offset < DdsHeader.SIZE:
+            raise ValueError("truncated DDS header")
+
+        (
+            magic,
+            self.height,
+            self.width,
+            self.levels,
+            self.pixel_format_flags,
+            self.four_cc,
+        ) = DdsHeader.SCHEMA.unpack(data, offset)
+
+        if magic != DdsHeader.MAGIC:
+            raise ValueError("not a DDS file")
+
+    @property
+    def block_size(self):
+        # None for formats that aren't block-compressed, or that we don't know.
+        if self.pixel_format_flags & DdsHeader.DDPF_FOURCC == 0:
+            return None
+
+        return DdsHeader.BLOCK_SIZES.get(self.four_cc)
+
+    @staticmethod
+    def pack(width, height, levels, four_cc):
+        # A header for a block-compressed texture of the given format, with
+        # `levels` mip levels following it.
+        block_size = DdsHeader.BLOCK_SIZES[four_cc]
+        linear_size = ((width + 3) // 4) * ((height + 3) // 4) * block_size
+
+        flags = (
+            DdsHeader.DDSD_CAPS
+            | DdsHeader.DDSD_HEIGHT
+            | DdsHeader.DDSD_WIDTH
+            | DdsHeader.DDSD_PIXELFORMAT
+            | DdsHeader.DDSD_LINEARSIZE
+        )
+        caps = DdsHeader.DDSCAPS_TEXTURE
+        if levels > 1:
+            flags |= DdsHeader.DDSD_MIPMAPCOUNT
+            caps |= DdsHeader.DDSCAPS_COMPLEX | DdsHeader.DDSCAPS_MIPMAP
+
+        header = bytearray(DdsHeader.SIZE)
+        struct.pack_into(
+            "<4s7I",
+            header,
+            0x00,
+            DdsHeader.MAGIC,
+            0x7C,
+            flags,
+            height,
+            width,
+            linear_size,
+            0,
+            levels,
+        )
+        struct.pack_into("<2I4s", header, 0x4C, 0x20, DdsHeader.DDPF_FOURCC, four_cc)
+        struct.pack_into("<I", header, 0x6C, caps)
+
+        return bytes(header)
+
+
+def flip_blocks(data, width, height, four_cc):
+    # Flip block-compressed image data vertically without decoding it, by
+    # reversing the rows of blocks and the rows of indices within each block.
+    # Images whose height is over 4 and not a multiple of 4 can't be flipped
+    # block by block, and give None.
+    if height > 4 and height % 4 != 0:
+        return None
+
+    block_size = DdsHeader.BLOCK_SIZES[four_cc]
+    blocks_x = (width + 3) // 4
+    blocks_y = (height + 3) // 4
+
+    blocks = np.frombuffer(data, np.uint8, blocks_x * blocks_y * block_size)
+    blocks = blocks.reshape(blocks_y, blocks_x, block_size)[::-1].copy()
+
+    # Only the first `height` rows of a block are used in images shorter than a
+    # block, and only those are reversed.
+    rows = min(height, 4)
+    order = list(range(rows))[::-1] + list(range(rows, 4))
+
+    # Colour indices are the last 4 bytes, one byte per row.
+    blocks[..., -4:] = blocks[..., -4:][..., order]
+
+    if four_cc == b"DXT3":
+        # Explicit alpha is the first 8 bytes, 2 bytes per row.
+        alpha = blocks[..., :8].reshape(blocks_y, blocks_x, 4, 2)
+        blocks[..., :8] = alpha[..., order, :].reshape(blocks_y, blocks_x, 8)
+    elif four_cc == b"DXT5":
+        # Alpha indices are the 6 bytes after the endpoints, 12 bits per row.
+        alpha_bits = np.zeros((blocks_y, blocks_x, 8), np.uint8)
+        alpha_bits[..., :6] = blocks[..., 2:8]
+        alpha_bits = alpha_bits.view("<u8")[..., 0]
+
+        flipped_bits = np.zeros_like(alpha_bits)
+        for row, source_row in enumerate(order):
+            flipped_bits |= ((alpha_bits >> (12 * source_row)) & 0xFFF) << (12 * row)
+
+        blocks[..., 2:8] = flipped_bits[..., None].view(np.uint8)[..., :6]
+
+    return blocks.tobytes()
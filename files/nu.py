@@ -1,4 +1,8 @@
+from array import array
 from enum import Enum
+from functools import cached_property
+
+import numpy as np
 
 from .read import *
 
@@ -17,12 +21,27 @@ class NuTextureType(Enum):
 class NuTextureHeader:
     SIZE = 0x14
 
+    SCHEMA = Schema(
+        ("width", 0x00, "I"),
+        ("height", 0x04, "I"),
+        ("levels", 0x08, "I"),
+        ("type", 0x0C, "I"),
+        ("data_offset", 0x10, "I"),
+    )
+
+    # The same layout as a NumPy dtype, for decoding a whole table at once.
+    DTYPE = SCHEMA.dtype(SIZE)
+
     def __init__(self, data, offset):
-        self.width = read_u32(data, offset + 0x00)
-        self.height = read_u32(data, offset + 0x04)
-        self.levels = read_u32(data, offset + 0x08)
-        self.type = NuTextureType(read_u32(data, offset + 0x0C))
-        self.data_offset = read_u32(data, offset + 0x10)
+        (
+            self.width,
+            self.height,
+            self.levels,
+            texture_type,
+            self.data_offset,
+        ) = NuTextureHeader.SCHEMA.unpack(data, offset)
+
+        self.type = NuTextureType(texture_type)
 
 
 class NuAlphaMode(Enum):
@@ -62,31 +81,37 @@ class NuMaterial:
         NuPlatform.XBOX: 0x0,
     }
 
-    texture_idx = None
+    SCHEMA = Schema(
+        ("attributes", 0x3C, "I"),
+        ("diffuse", 0x50, "3f"),
+        ("alpha", 0x70, "f"),
+        ("texture_idx", 0x74, "h"),
+        ("effect_id", 0x9D, "B"),
+    )
 
-    def __init__(self, data, offset, platform):
-        self.attributes = read_u32(
-            data, offset + 0x3C + NuMaterial.PLATFORM_OFFSETS[platform]
-        )
+    # The effect ID sits at the same offset on every platform.
+    PLATFORM_SCHEMAS = SCHEMA.per_platform(PLATFORM_OFFSETS, fixed=("effect_id",))
 
-        self.diffuse = NuColour3(
-            data, offset + 0x50 + NuMaterial.PLATFORM_OFFSETS[platform]
-        )
+    texture_idx = None
 
-        # This alpha value isn't used in rendering. It can hint as to the alpha
-        # values in vertex data, however.
-        self.alpha = read_f32(
-            data, offset + 0x70 + NuMaterial.PLATFORM_OFFSETS[platform]
-        )
+    def __init__(self, data, offset, platform):
+        (
+            self.attributes,
+            r,
+            g,
+            b,
+            # This alpha value isn't used in rendering. It can hint as to the
+            # alpha values in vertex data, however.
+            self.alpha,
+            texture_idx,
+            self.effect_id,
+        ) = NuMaterial.PLATFORM_SCHEMAS[platform].unpack(data, offset)
+
+        self.diffuse = NuColour3.from_values(r, g, b)
 
-        texture_idx = read_i16(
-            data, offset + 0x74 + NuMaterial.PLATFORM_OFFSETS[platform]
-        )
         if texture_idx != -1:
             self.texture_idx = texture_idx & 0x7FFF
 
-        self.effect_id = read_u8(data, offset + 0x9D)
-
     def alpha_mode(self):
         return NuAlphaMode(self.attributes & 0xF)
 
@@ -106,27 +131,47 @@ class NuMaterial:
 class NuGeom:
     SIZE = 0x48
 
+    SCHEMA = Schema(
+        ("material_idx", 0x08, "I"),
+        ("vertex_type", 0x0C, "I"),
+        ("vertex_buf_idx", 0x1C, "i"),
+        ("prim_offset", 0x30, "I"),
+    )
+
     next = None
 
     def __init__(self, data, offset, vertex_bufs):
-        next_offset = read_u32(data, offset)
-        if next_offset != 0:
-            self.next = NuGeom(data, next_offset, vertex_bufs)
-
-        self.material_idx = read_u32(data, offset + 0x08)
-
-        vertex_type = NuVtxType(read_u32(data, offset + 0x0C))
-
-        vertex_buf_idx = read_i32(data, offset + 0x1C)
-        vertex_buf = vertex_bufs[vertex_buf_idx - 1]
-
-        self.vertices = []
-        if vertex_type == NuVtxType.TC1:
-            for i in range(len(vertex_buf) // NuVtxTc1.SIZE):
-                self.vertices.append(NuVtxTc1(vertex_buf, i * NuVtxTc1.SIZE))
+        (
+            self.material_idx,
+            vertex_type,
+            vertex_buf_idx,
+            prim_offset,
+        ) = NuGeom.SCHEMA.unpack(data, offset)
+
+        self.vertex_buf = vertex_bufs.decode(vertex_buf_idx - 1, NuVtxType(vertex_type))
+
+        self.prims = read_chain(NuPrim, data, prim_offset)
+        self.prim = self.prims[0] if self.prims else None
+
+    @cached_property
+    def vertices(self):
+        # Per-vertex objects are only built on request, as a compatibility view
+        # over the arrays in `vertex_buf`.
+        vertex_buf = self.vertex_buf
+
+        vertices = []
+        if vertex_buf.type == NuVtxType.TC1:
+            for position, normal, (r, g, b, a), uv in zip(
+                vertex_buf.positions.tolist(),
+                vertex_buf.normals.tolist(),
+                vertex_buf.colours.tolist(),
+                vertex_buf.uvs.tolist(),
+            ):
+                vertices.append(
+                    NuVtxTc1.from_values(*position, *normal, b, g, r, a, *uv)
+                )
 
-        prim_offset = read_u32(data, offset + 0x30)
-        self.prim = NuPrim(data, prim_offset)
+        return vertices
 
 
 class NuVtxType(Enum):
@@ -141,21 +186,35 @@ class NuTexType(Enum):
 class NuPrim:
     SIZE = 0x50
 
+    SCHEMA = Schema(
+        ("type", 0x04, "I"),
+        ("indices_count", 0x08, "H"),
+        ("indices_offset", 0x0C, "I"),
+    )
+
     next = None
 
     def __init__(self, data, offset):
-        next_offset = read_u32(data, offset + 0x00)
-        if next_offset != 0:
-            self.next = NuPrim(data, next_offset)
+        (prim_type, indices_count, indices_offset) = NuPrim.SCHEMA.unpack(data, offset)
 
-        self.type = NuPrimType(read_u32(data, offset + 0x04))
+        # Prims of a type we don't know are kept, with a type of None, so that
+        # the rest of the geom can still be used.
+        try:
+            self.type = NuPrimType(prim_type)
+        except ValueError:
+            self.type = None
 
-        indices_count = read_u16(data, offset + 0x08)
-        indices_offset = read_u32(data, offset + 0x0C)
+        # Indexed prims read `count` indices from the index buffer. The others
+        # use the first `count` vertices of the geom in order.
+        self.count = indices_count
 
-        self.index_buf = []
-        for i in range(indices_count):
-            self.index_buf.append(read_u16(data, indices_offset + i * 2))
+        # Empty prims may have any offset, which isn't read.
+        if indices_count != 0 and self.type is not None and self.type.indexed():
+            self.index_buf = np.frombuffer(
+                data, dtype="<u2", count=indices_count, offset=indices_offset
+            )
+        else:
+            self.index_buf = np.empty(0, dtype="<u2")
 
 
 class NuPrimType(Enum):
@@ -167,28 +226,72 @@ class NuPrimType(Enum):
     NDXTRI = 0x5
     NDXTRISTRIP = 0x6
 
+    def indexed(self):
+        return self in (NuPrimType.NDXLINE, NuPrimType.NDXTRI, NuPrimType.NDXTRISTRIP)
+
+
+def read_chain(cls, data, offset, *args):
+    # Walk a linked list of records, each of which begins with the offset of
+    # the next. This is done iteratively so that long chains don't recurse. An
+    # offset that has already been visited can only come from corrupt data, so
+    # the walk stops there instead of looping forever.
+    records = []
+    visited = set()
+    while offset != 0 and offset not in visited:
+        visited.add(offset)
+
+        record = cls(data, offset, *args)
+        if records:
+            records[-1].next = record
+
+        records.append(record)
+
+        offset = read_u32(data, offset)
+
+    return records
+
 
 class NuMtx:
     SIZE = 0x40
 
+    SCHEMA = Schema(("values", 0x00, "16f"))
+
+    # Matrices are stored as a flat, row-major array of 16 floats, since scenes
+    # can contain a great many of them.
+    __slots__ = ("values",)
+
     def __init__(self, data, offset):
-        self.rows = []
-        for row in range(4):
-            self.rows.append([])
+        self.values = array("f", NuMtx.SCHEMA.unpack(data, offset))
 
-            for col in range(4):
-                i = row * 4 + col
+    @classmethod
+    def from_values(cls, values):
+        mtx = cls.__new__(cls)
+        mtx.values = array("f", values)
+        return mtx
 
-                self.rows[row].append(read_f32(data, offset + i * 4))
+    @property
+    def rows(self):
+        return [self.values[row * 4 : row * 4 + 4].tolist() for row in range(4)]
+
+    def __repr__(self):
+        return "NuMtx({})".format(self.rows)
 
 
 class NuVec:
     SIZE = 0x0C
 
+    SCHEMA = Schema(("x", 0x00, "f"), ("y", 0x04, "f"), ("z", 0x08, "f"))
+
+    __slots__ = ("x", "y", "z")
+
     def __init__(self, data, offset):
-        self.x = read_f32(data, offset)
-        self.y = read_f32(data, offset + 0x04)
-        self.z = read_f32(data, offset + 0x08)
+        (self.x, self.y, self.z) = NuVec.SCHEMA.unpack(data, offset)
+
+    @classmethod
+    def from_values(cls, x, y, z):
+        vec = cls.__new__(cls)
+        (vec.x, vec.y, vec.z) = (x, y, z)
+        return vec
 
     def __repr__(self):
         return "NuVec({}, {}, {})".format(self.x, self.y, self.z)
@@ -197,35 +300,97 @@ class NuVec:
 class NuVtxTc1:
     SIZE = 0x24
 
+    SCHEMA = Schema(
+        ("position", 0x00, "3f"),
+        ("normal", 0x0C, "3f"),
+        ("colour", 0x18, "4B"),
+        ("uv", 0x1C, "2f"),
+    )
+
+    DTYPE = SCHEMA.dtype(SIZE)
+
     def __init__(self, data, offset):
-        self.position = NuVec(data, offset)
-        self.normal = NuVec(data, offset + 0x0C)
-        self.colour = NuColour32(data, offset + 0x18)
+        self.__init_values(NuVtxTc1.SCHEMA.unpack(data, offset))
+
+    @classmethod
+    def from_values(cls, *values):
+        vertex = cls.__new__(cls)
+        vertex.__init_values(values)
+        return vertex
+
+    def __init_values(self, values):
+        self.position = NuVec.from_values(*values[0:3])
+        self.normal = NuVec.from_values(*values[3:6])
+        self.colour = NuColour32.from_values(*values[6:10])
+        self.uv = values[10:12]
+
+
+class NuVtxBuffer:
+    # Structured dtypes for each vertex format. Each must provide `position`,
+    # `normal`, `colour` (as BGRA bytes, see `NuColour32`) and `uv` fields.
+    DTYPES = {
+        NuVtxType.TC1: NuVtxTc1.DTYPE,
+    }
 
-        self.uv = (
-            read_f32(data, offset + 0x1C),
-            read_f32(data, offset + 0x20),
-        )
+    def __init__(self, data, vertex_type):
+        self.type = vertex_type
+
+        dtype = NuVtxBuffer.DTYPES[vertex_type]
+        self.count = len(data) // dtype.itemsize
+
+        vertices = np.frombuffer(data, dtype=dtype, count=self.count)
+
+        self.positions = np.ascontiguousarray(vertices["position"])
+        self.normals = np.ascontiguousarray(vertices["normal"])
+
+        # Reorder colour channels to RGBA.
+        self.colours = np.ascontiguousarray(vertices["colour"][:, (2, 1, 0, 3)])
+
+        self.uvs = np.ascontiguousarray(vertices["uv"])
+
+    def __repr__(self):
+        return "NuVtxBuffer(type = {}, count = {})".format(self.type, self.count)
 
 
 class NuColour3:
     SIZE = 0xC
 
+    SCHEMA = Schema(("r", 0x00, "f"), ("g", 0x04, "f"), ("b", 0x08, "f"))
+
+    __slots__ = ("r", "g", "b")
+
     def __init__(self, data, offset):
-        self.r = read_f32(data, offset)
-        self.g = read_f32(data, offset + 0x04)
-        self.b = read_f32(data, offset + 0x08)
+        (self.r, self.g, self.b) = NuColour3.SCHEMA.unpack(data, offset)
+
+    @classmethod
+    def from_values(cls, r, g, b):
+        colour = cls.__new__(cls)
+        (colour.r, colour.g, colour.b) = (r, g, b)
+        return colour
 
 
 class NuColour32:
+    # NUCOLOUR32 is stored with 8 bits per channel as a 32-bit ARGB value. We
+    # can read these back in opposite order to account for endianness.
+    SCHEMA = Schema(
+        ("blue", 0x00, "B"),
+        ("green", 0x01, "B"),
+        ("red", 0x02, "B"),
+        ("alpha", 0x03, "B"),
+    )
+
+    __slots__ = ("r", "g", "b", "a")
+
     def __init__(self, data, offset):
-        # NUCOLOUR32 is stored with 8 bits per channel as a 32-bit ARGB value.
-        # We can read these back in opposite order to account for endianness.
-        blue = read_u8(data, offset)
-        green = read_u8(data, offset + 0x01)
-        red = read_u8(data, offset + 0x02)
-        alpha = read_u8(data, offset + 0x03)
+        self.__init_values(*NuColour32.SCHEMA.unpack(data, offset))
+
+    @classmethod
+    def from_values(cls, blue, green, red, alpha):
+        colour = cls.__new__(cls)
+        colour.__init_values(blue, green, red, alpha)
+        return colour
 
+    def __init_values(self, blue, green, red, alpha):
         self.r = red / 255.0
         self.g = green / 255.0
         self.b = blue / 255.0
@@ -236,11 +401,16 @@ class NuColour32:
 
 
 class NuAnimData:
-    def __init__(self, data, offset, header):
-        self.length = read_f32(data, offset)
+    SCHEMA = Schema(
+        ("length", 0x00, "f"),
+        ("chunks_count", 0x08, "i"),
+        ("chunks_offset", 0x0C, "I"),
+    )
 
-        chunks_count = read_i32(data, offset + 0x08)
-        chunks_offset = read_u32(data, offset + 0x0C)
+    def __init__(self, data, offset, header):
+        (self.length, chunks_count, chunks_offset) = NuAnimData.SCHEMA.unpack(
+            data, offset
+        )
 
         self.chunks = []
         for i in range(chunks_count):
@@ -253,13 +423,25 @@ class NuAnimData:
 
 
 class NuAnimDataChunk:
+    SCHEMA = Schema(
+        ("nodes_count", 0x00, "i"),
+        ("curvesets_offset", 0x08, "I"),
+        ("keys_offset", 0x0C, "I"),
+        ("curves_offset", 0x10, "I"),
+    )
+
     def __init__(self, data, offset):
-        nodes_count = read_i32(data, offset)
+        (
+            nodes_count,
+            curvesets_offset,
+            keys_offset,
+            curves_offset,
+        ) = NuAnimDataChunk.SCHEMA.unpack(data, offset)
 
-        keys_offset = read_u32(data, offset + 0x0C)
-        curves_offset = read_u32(data, offset + 0x10)
+        # Curves from every curveset are collected here as (mask, keys offset,
+        # keys count), and each curveset refers to them by index.
+        curves = []
 
-        curvesets_offset = read_u32(data, offset + 0x08)
         self.curvesets = []
         if curvesets_offset != 0:
             for i in range(nodes_count):
@@ -267,28 +449,99 @@ class NuAnimDataChunk:
                 if curvesets_offset_i != 0:
                     self.curvesets.append(
                         NuAnimCurveSet(
-                            data, curvesets_offset_i, keys_offset, curves_offset
+                            data, curvesets_offset_i, keys_offset, curves_offset, curves
                         )
                     )
 
+        # Keys and curves are stored as flat arrays, with each curve's keys
+        # given as a range of the keys array.
+        self.masks = np.array([mask for (mask, _, _) in curves], dtype="<u4")
+        self.key_counts = np.array([count for (_, _, count) in curves], dtype="<i4")
+        (self.keys, self.key_starts) = NuAnimDataChunk.read_keys(data, curves)
+
+    @staticmethod
+    def read_keys(data, curves):
+        ranges = [(offset, count) for (_, offset, count) in curves if count > 0]
+        if not ranges:
+            return (
+                np.empty(0, dtype=NuAnimKey.DTYPE),
+                np.zeros(len(curves), dtype="<i4"),
+            )
+
+        # Curves of a chunk usually share one contiguous run of keys, which is
+        # used in place. Otherwise, each curve's keys are copied out.
+        start = min(offset for (offset, _) in ranges)
+        end = max(offset + count * NuAnimKey.SIZE for (offset, count) in ranges)
+        if end - start <= sum(count for (_, count) in ranges) * NuAnimKey.SIZE and all(
+            (offset - start) % NuAnimKey.SIZE == 0 for (offset, _) in ranges
+        ):
+            keys = np.frombuffer(
+                data, NuAnimKey.DTYPE, (end - start) // NuAnimKey.SIZE, start
+            )
+            key_starts = [
+                (offset - start) // NuAnimKey.SIZE if count > 0 else 0
+                for (_, offset, count) in curves
+            ]
+        else:
+            keys = np.concatenate(
+                [
+                    np.frombuffer(data, NuAnimKey.DTYPE, count, offset)
+                    for (offset, count) in ranges
+                ]
+            )
+            key_starts = []
+            next_key = 0
+            for _, _, count in curves:
+                key_starts.append(next_key)
+                next_key += count
+
+        return (keys, np.array(key_starts, dtype="<i4"))
+
+    def curve_keys(self, curve_idx):
+        # The keys of one curve, as a view of the keys array.
+        key_start = self.key_starts[curve_idx]
+        return self.keys[key_start : key_start + self.key_counts[curve_idx]]
+
     def __repr__(self):
-        return "NuAnimDataChunk({})".format(self.curvesets)
+        return "NuAnimDataChunk(keys = {}, curves = {}, curvesets = {})".format(
+            len(self.keys), len(self.masks), self.curvesets
+        )
 
 
 class NuAnimCurveSet:
-    def __init__(self, data, offset, chunk_keys_offset, chunk_curves_offset):
-        self.flags = read_u32(data, offset)
+    SCHEMA = Schema(
+        ("flags", 0x00, "I"),
+        ("constants_offset", 0x04, "I"),
+        ("curves_offset", 0x08, "I"),
+        ("curves_count", 0x0C, "i"),
+    )
+
+    CONSTANTS_SCHEMA = Schema(("constants", 0x00, "9f"))
+
+    # Marks a component that is animated by a curve rather than constant.
+    CURVE_CONSTANT = 3.4028234663852886e38
+
+    __slots__ = ("flags", "has_rotation", "has_scale", "constants", "curve_indices")
+
+    def __init__(self, data, offset, chunk_keys_offset, chunk_curves_offset, curves):
+        (
+            self.flags,
+            constants_offset,
+            curves_offset,
+            curves_count,
+        ) = NuAnimCurveSet.SCHEMA.unpack(data, offset)
+
         self.has_rotation = (self.flags & 0x01) != 0
         self.has_scale = (self.flags & 0x08) != 0
 
-        constants_offset = read_u32(data, offset + 0x04)
-        curves_offset = read_u32(data, offset + 0x08)
-        curves_count = read_i32(data, offset + 0x0C)
-
         assert curves_count == 9, "expecting exactly 9 animation components"
 
-        self.constants = {}
-        self.curves = {}
+        # Both are indexed by component. Components without a curve have a
+        # curve index of -1, and use their constant instead.
+        self.constants = array(
+            "f", NuAnimCurveSet.CONSTANTS_SCHEMA.unpack(data, constants_offset)
+        )
+        self.curve_indices = array("i", [-1] * curves_count)
 
         next_curve = 0
         next_key = 0
@@ -309,10 +562,7 @@ class NuAnimCurveSet:
             ):
                 continue
 
-            constants_offset_i = constants_offset + i * 0x04
-
-            constant = read_f32(data, constants_offset_i)
-            if constant == 3.4028234663852886e38:
+            if self.constants[i] == NuAnimCurveSet.CURVE_CONSTANT:
                 chunk_curves_offset_next = (
                     chunk_curves_offset + next_curve * NuAnimCurve.SIZE
                 )
@@ -320,64 +570,72 @@ class NuAnimCurveSet:
 
                 chunk_keys_offset_next = chunk_keys_offset + next_key * NuAnimKey.SIZE
 
-                self.curves[component] = NuAnimCurve(
-                    data, chunk_curves_offset_next, chunk_keys_offset_next
+                self.curve_indices[i] = len(curves)
+                curves.append(
+                    NuAnimCurve.read(
+                        data, chunk_curves_offset_next, chunk_keys_offset_next
+                    )
                 )
 
-                next_key += len(self.curves[component].keys)
-            else:
-                self.constants[component] = constant
+                next_key += curves[-1][2]
+            elif curves_offset != 0:
+                curves_offset_i = read_u32(data, curves_offset + i * 0x04)
 
-                if curves_offset != 0:
-                    curves_offset_i = read_u32(data, curves_offset + i * 0x04)
-
-                    if curves_offset_i != 0:
-                        self.curves[component] = NuAnimCurve(
-                            data, curves_offset_i, None
-                        )
+                if curves_offset_i != 0:
+                    self.curve_indices[i] = len(curves)
+                    curves.append(NuAnimCurve.read(data, curves_offset_i, None))
 
     def __repr__(self):
-        return "NuAnimCurveSet(flags = 0b{:08b}, curves = {}, constants = {})".format(
-            self.flags, self.curves, self.constants
-        )
+        return (
+            "NuAnimCurveSet(flags = 0b{:08b}, curve_indices = {}, constants = {})"
+        ).format(self.flags, self.curve_indices.tolist(), self.constants.tolist())
 
 
 class NuAnimCurve:
     SIZE = 0x10
 
-    def __init__(self, data, offset, chunk_keys_offset):
-        self.mask = read_u32(data, offset)
-
-        keys_offset = read_u32(data, offset + 0x04)
-        keys_count = read_i32(data, offset + 0x08)
-
-        flags = read_u32(data, offset + 0x0C)
+    SCHEMA = Schema(
+        ("mask", 0x00, "I"),
+        ("keys_offset", 0x04, "I"),
+        ("keys_count", 0x08, "i"),
+        ("flags", 0x0C, "I"),
+    )
+
+    @staticmethod
+    def read(data, offset, chunk_keys_offset):
+        # Curves are only read as (mask, keys offset, keys count), which the
+        # chunk stores in its arrays. Curves without keys have a count of 0.
+        (mask, keys_offset, keys_count, flags) = NuAnimCurve.SCHEMA.unpack(
+            data, offset
+        )
 
-        keys_offset_to_read = None
         if chunk_keys_offset:
-            keys_offset_to_read = chunk_keys_offset
+            return (mask, chunk_keys_offset, max(keys_count, 0))
         elif keys_offset != 0:
-            keys_offset_to_read = keys_offset
+            return (mask, keys_offset, max(keys_count, 0))
+        else:
+            return (mask, 0, 0)
 
-        self.keys = []
-        if keys_offset_to_read is not None:
-            for i in range(keys_count):
-                keys_offset_i = keys_offset_to_read + i * NuAnimKey.SIZE
 
-                self.keys.append(NuAnimKey(data, keys_offset_i))
+class NuAnimKey:
+    SIZE = 0x10
 
-    def __repr__(self):
-        return "NuAnimCurve(mask = 0b{:032b}, keys = {})".format(self.mask, self.keys)
+    SCHEMA = Schema(
+        ("time", 0x00, "f"),
+        ("delta_time", 0x04, "f"),
+        ("c", 0x08, "f"),
+        ("d", 0x0C, "f"),
+    )
 
+    # The same layout as a NumPy dtype, for the key arrays of a chunk.
+    DTYPE = SCHEMA.dtype(SIZE)
 
-class NuAnimKey:
-    SIZE = 0x10
+    __slots__ = ("time", "delta_time", "c", "d")
 
     def __init__(self, data, offset):
-        self.time = read_f32(data, offset)
-        self.delta_time = read_f32(data, offset + 0x04)
-        self.c = read_f32(data, offset + 0x08)
-        self.d = read_f32(data, offset + 0x0C)
+        (self.time, self.delta_time, self.c, self.d) = NuAnimKey.SCHEMA.unpack(
+            data, offset
+        )
 
     def __repr__(self):
         return "NuAnimKey(time = {}, delta_time = {}, c = {}, d = {})".format(
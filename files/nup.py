@@ -1,4 +1,7 @@
 from enum import Enum
+from functools import cached_property
+
+import numpy as np
 
 from .types import *
 
@@ -13,94 +16,151 @@ class NuPlatformException(Exception):
 class Nup:
     HEADER_SIZE = 0x40
 
-    def __init__(self, data, platform=None):
-        header = NupHeader(data)
-        body = data[0x40:]
-
-        # Load textures.
-        texture_data_offset = read_u32(body, header.texture_hdr_offset)
-        texture_data_size = read_u32(body, header.texture_hdr_offset + 0x04)
-        textures_count = read_i32(body, header.texture_hdr_offset + 0x08)
+    # Bump whenever parsed output changes, to invalidate cached scenes.
+    PARSER_VERSION = 4
 
-        # Determine if all textures are DDS to infer platform.
-        is_pc = True
-        is_xbox = True
-        self.textures = []
-        for i in range(textures_count):
-            texture_header = NuTextureHeader(
-                body, header.texture_hdr_offset + 0x0C + i * NuTextureHeader.SIZE
-            )
+    TEXTURES_SCHEMA = Schema(
+        ("texture_data_offset", 0x00, "I"),
+        ("texture_data_size", 0x04, "I"),
+        ("textures_count", 0x08, "i"),
+    )
 
-            # Texture size is not stored in the file, so we need to calculate a
-            # rough size from the offset of each texture. This works because
-            # textures are stored contiguously.
-            if i < textures_count - 1:
-                next_texture_header = NuTextureHeader(
-                    body,
-                    header.texture_hdr_offset + 0x0C + (i + 1) * NuTextureHeader.SIZE,
-                )
-
-                size_estimate = (
-                    next_texture_header.data_offset - texture_header.data_offset
-                )
-            else:
-                size_estimate = texture_data_size - texture_header.data_offset
+    def __init__(self, data, platform=None):
+        # Only the header is read up front. Each section is decoded from the
+        # header offsets on first access, so callers only pay for the sections
+        # they use.
+        self.header = NupHeader(data)
+
+        # Slicing a memoryview doesn't copy, so the body, texture payloads and
+        # vertex buffers all refer to the original data.
+        self.body = memoryview(data)[0x40:]
+
+        # Used for materials when the platform can't be determined from
+        # textures.
+        self.fallback_platform = platform
+
+    @cached_property
+    def texture_headers(self):
+        # The whole texture header table, decoded in one pass.
+        body = self.body
+        header = self.header
+
+        (_, _, textures_count) = Nup.TEXTURES_SCHEMA.unpack(
+            body, header.texture_hdr_offset
+        )
+
+        return np.frombuffer(
+            body,
+            NuTextureHeader.DTYPE,
+            max(textures_count, 0),
+            header.texture_hdr_offset + 0x0C,
+        )
+
+    @cached_property
+    def textures(self):
+        body = self.body
+        header = self.header
+        texture_headers = self.texture_headers
+
+        (
+            texture_data_offset,
+            texture_data_size,
+            textures_count,
+        ) = Nup.TEXTURES_SCHEMA.unpack(body, header.texture_hdr_offset)
+
+        # Texture size is not stored in the file, so the most we can tell from
+        # the table is the distance to the next texture, which works because
+        # textures are stored contiguously but may include trailing padding.
+        data_offsets = texture_headers["data_offset"].astype(np.int64)
+        size_estimates = np.diff(data_offsets, append=texture_data_size)
+
+        textures = []
+        for texture_header, size_estimate in zip(
+            texture_headers.tolist(), size_estimates.tolist()
+        ):
+            (width, height, levels, texture_type, data_offset) = texture_header
+            texture_type = NuTextureType(texture_type)
+
+            # Block-compressed payloads can be sized exactly from the header,
+            # falling back to the estimate where the header doesn't agree with
+            # the layout.
+            size = Texture.payload_size(width, height, levels, texture_type)
+            if size is None or size > size_estimate:
+                size = size_estimate
 
             offset_in_body = (
-                header.texture_hdr_offset
-                + 0x0C
-                + texture_data_offset
-                + texture_header.data_offset
+                header.texture_hdr_offset + 0x0C + texture_data_offset + data_offset
             )
 
-            # Check if texture is DDS. Used to determine platform.
-            is_pc = is_pc and texture_header.type == NuTextureType.DDS
-            is_xbox = is_xbox and texture_header.type != NuTextureType.DDS
-
-            self.textures.append(
-                Texture(body, offset_in_body, size_estimate, texture_header)
+            textures.append(
+                Texture(body, offset_in_body, size, width, height, levels, texture_type)
             )
 
+        return textures
+
+    @cached_property
+    def platform(self):
+        # Determine if all textures are DDS to infer platform.
+        is_dds = self.texture_headers["type"] == NuTextureType.DDS.value
+        is_pc = bool(is_dds.all())
+        is_xbox = not is_dds.any()
+
         # Determine platform from texture hints.
         if is_pc and is_xbox:
-            self.platform = None  # No textures present.
+            return None  # No textures present.
         elif is_pc:
-            self.platform = NuPlatform.PC  # All textures are DDS.
+            return NuPlatform.PC  # All textures are DDS.
         elif is_xbox:
-            self.platform = NuPlatform.XBOX  # No DDS textures.
+            return NuPlatform.XBOX  # No DDS textures.
         else:  # Mixed textures.
             raise NuPlatformException(
                 "Mixed texture types found; cannot determine platform."
             )
 
-        # Load materials.
+    @cached_property
+    def materials(self):
+        body = self.body
+        header = self.header
+        platform = self.platform or self.fallback_platform
+
         materials_count = read_i32(body, header.materials_offset)
 
-        self.materials = []
+        materials = []
         for i in range(materials_count):
             material_offset = read_u32(body, header.materials_offset + 0x04 + i * 0x04)
 
-            self.materials.append(NuMaterial(body, material_offset, self.platform or platform))
+            materials.append(NuMaterial(body, material_offset, platform))
 
-        # Load vertex data.
-        vertex_bufs_count = read_i32(body, header.vertex_data_offset)
+        return materials
 
-        vertex_bufs = [
-            read_vertices(i, header.vertex_data_offset, body)
-            for i in range(vertex_bufs_count)
-        ]
+    @cached_property
+    def vertex_bufs(self):
+        return NuVertexData(self.body, self.header.vertex_data_offset)
 
-        self.scene = NuScene(body, header.scene_offset, header, vertex_bufs)
+    @cached_property
+    def scene(self):
+        return NuScene(
+            self.body, self.header.scene_offset, self.header, self.vertex_bufs
+        )
 
 
 class NupHeader:
-    def __init__(self, data):
-        self.texture_hdr_offset = read_u32(data, 0x08)
-        self.materials_offset = read_u32(data, 0x0C)
+    SCHEMA = Schema(
+        ("texture_hdr_offset", 0x08, "I"),
+        ("materials_offset", 0x0C, "I"),
+        ("vertex_data_offset", 0x14, "I"),
+        ("scene_offset", 0x18, "I"),
+        ("instances_offset", 0x1C, "I"),
+    )
 
-        self.vertex_data_offset = read_u32(data, 0x14)
-        self.scene_offset = read_u32(data, 0x18)
-        self.instances_offset = read_u32(data, 0x1C)
+    def __init__(self, data):
+        (
+            self.texture_hdr_offset,
+            self.materials_offset,
+            self.vertex_data_offset,
+            self.scene_offset,
+            self.instances_offset,
+        ) = NupHeader.SCHEMA.unpack(data, 0x00)
 
 
 class RtlSet:
@@ -122,15 +182,24 @@ class RtlSet:
 class Rtl:
     SIZE = 0x8C
 
+    SCHEMA = Schema(
+        ("pos", 0x00, "3f"),
+        ("dir", 0x0C, "3f"),
+        ("colour", 0x18, "3f"),
+        ("type", 0x58, "B"),
+    )
+
     def __init__(self, data, offset):
-        self.type = RtlType(read_u8(data, offset + 0x58))
+        values = Rtl.SCHEMA.unpack(data, offset)
+
+        self.type = RtlType(values[9])
 
         if self.type == RtlType.POINT:
-            self.pos = NuVec(data, offset + 0x00)
+            self.pos = NuVec.from_values(*values[0:3])
         elif self.type == RtlType.DIRECTIONAL:
-            self.dir = NuVec(data, offset + 0x0C)
+            self.dir = NuVec.from_values(*values[3:6])
 
-        self.colour = NuColour3(data, offset + 0x18)
+        self.colour = NuColour3.from_values(*values[6:9])
 
 
 class RtlType(Enum):
@@ -146,45 +215,82 @@ class RtlType(Enum):
 
 
 class NuScene:
-    def __init__(self, data, offset, header, vertex_bufs):
-        objects_count = read_i32(data, offset + 0x10)
-        objects_offset = read_u32(data, offset + 0x14)
+    SCHEMA = Schema(
+        ("objects_count", 0x10, "i"),
+        ("objects_offset", 0x14, "I"),
+        ("instances_count", 0x18, "i"),
+        ("splines_count", 0x28, "i"),
+        ("splines_offset", 0x2C, "I"),
+        ("anim_data_offset", 0x48, "I"),
+        ("anim_data_count", 0x4C, "i"),
+    )
 
-        self.objects = []
-        for i in range(objects_count):
-            objects_offset_i = objects_offset + i * 4
+    def __init__(self, data, offset, header, vertex_bufs):
+        self.data = data
+        self.header = header
+        self.vertex_bufs = vertex_bufs
+
+        (
+            self.objects_count,
+            self.objects_offset,
+            self.instances_count,
+            self.splines_count,
+            self.splines_offset,
+            self.anim_data_offset,
+            self.anim_data_count,
+        ) = NuScene.SCHEMA.unpack(data, offset)
+
+    @cached_property
+    def objects(self):
+        data = self.data
+
+        objects = []
+        for i in range(self.objects_count):
+            objects_offset_i = self.objects_offset + i * 4
             object_offset = read_u32(data, objects_offset_i)
 
-            self.objects.append(NuObject(data, object_offset, vertex_bufs))
+            objects.append(NuObject(data, object_offset, self.vertex_bufs))
+
+        return objects
+
+    @cached_property
+    def instances(self):
+        data = self.data
 
-        instances_count = read_i32(data, offset + 0x18)
+        instances = []
+        for i in range(self.instances_count):
+            instances_offset_i = self.header.instances_offset + i * NuInstance.SIZE
 
-        self.instances = []
-        for i in range(instances_count):
-            instances_offset_i = header.instances_offset + i * NuInstance.SIZE
+            instances.append(NuInstance(data, instances_offset_i))
 
-            self.instances.append(NuInstance(data, instances_offset_i))
+        return instances
 
-        splines_count = read_i32(data, offset + 0x28)
-        splines_offset = read_u32(data, offset + 0x2C)
+    @cached_property
+    def splines(self):
+        data = self.data
 
-        self.splines = []
-        for i in range(splines_count):
-            splines_offset_i = splines_offset + i * NuSpline.SIZE
+        splines = []
+        for i in range(self.splines_count):
+            splines_offset_i = self.splines_offset + i * NuSpline.SIZE
 
-            self.splines.append(NuSpline(data, splines_offset_i))
+            splines.append(NuSpline(data, splines_offset_i))
 
-        anim_data_offset = read_u32(data, offset + 0x48)
-        anim_data_count = read_i32(data, offset + 0x4C)
+        return splines
 
-        self.anim_data = []
-        for i in range(anim_data_count):
-            anim_data_offset_i = read_u32(data, anim_data_offset + i * 0x04)
+    @cached_property
+    def anim_data(self):
+        data = self.data
+
+        anim_data = []
+        for i in range(self.anim_data_count):
+            anim_data_offset_i = read_u32(data, self.anim_data_offset + i * 0x04)
 
             if anim_data_offset_i != 0:
-                self.anim_data.append(NuAnimData(data, anim_data_offset_i, header))
+                anim_data.append(NuAnimData(data, anim_data_offset_i, self.header))
             else:
-                self.anim_data.append(None)
+                anim_data.append(None)
+
+        return anim_data
 
 
 class NuObject:
@@ -194,24 +300,33 @@ class NuObject:
 
     def __init__(self, data, offset, vertex_bufs):
         geom_offset = read_u32(data, offset + 0x0C)
-        if geom_offset != 0:
-            self.geom = NuGeom(data, geom_offset, vertex_bufs)
+
+        self.geoms = read_chain(NuGeom, data, geom_offset, vertex_bufs)
+        if self.geoms:
+            self.geom = self.geoms[0]
 
 
 class NuInstance:
     SIZE = 0x50
 
+    SCHEMA = Schema(
+        ("transform", 0x00, "16f"),
+        ("obj_idx", 0x40, "h"),
+        ("flags", 0x44, "I"),
+        ("anim_offset", 0x48, "I"),
+    )
+
     anim = None
 
     def __init__(self, data, offset):
-        self.transform = NuMtx(data, offset)
-        self.obj_idx = read_i16(data, offset + 0x40)
+        values = NuInstance.SCHEMA.unpack(data, offset)
+
+        self.transform = NuMtx.from_values(values[0:16])
 
-        flags = read_u32(data, offset + 0x44)
+        (self.obj_idx, flags, anim_offset) = values[16:19]
 
         self.is_visible = (flags & 1) != 0
 
-        anim_offset = read_u32(data, offset + 0x48)
         if anim_offset != 0:
             self.anim = NuInstAnim(data, anim_offset)
 
@@ -219,25 +334,43 @@ class NuInstance:
 class NuInstAnim:
     SIZE = 0x60
 
+    SCHEMA = Schema(
+        ("mtx", 0x00, "16f"),
+        ("time_factor", 0x40, "f"),
+        ("time_first", 0x44, "f"),
+        ("time_interval", 0x48, "f"),
+        ("anim_idx", 0x5C, "B"),
+    )
+
     def __init__(self, data, offset):
-        self.mtx = NuMtx(data, offset)
-        self.time_factor = read_f32(data, offset + 0x40)
-        self.time_first = read_f32(data, offset + 0x44)
-        self.time_interval = read_f32(data, offset + 0x48)
-        self.anim_idx = read_u8(data, offset + 0x5C)
+        values = NuInstAnim.SCHEMA.unpack(data, offset)
+
+        self.mtx = NuMtx.from_values(values[0:16])
+
+        (
+            self.time_factor,
+            self.time_first,
+            self.time_interval,
+            self.anim_idx,
+        ) = values[16:20]
 
 
 class NuSpline:
     SIZE = 0x0C
 
+    SCHEMA = Schema(
+        ("points_count", 0x00, "h"),
+        ("name_offset", 0x04, "I"),
+        ("points_offset", 0x08, "I"),
+    )
+
     def __init__(self, data, offset):
-        points_count = read_i16(data, offset)
+        (points_count, name_offset, points_offset) = NuSpline.SCHEMA.unpack(
+            data, offset
+        )
 
-        name_offset = read_u32(data, offset + 0x04)
         self.name = read_string(data, name_offset)
 
-        points_offset = read_u32(data, offset + 0x08)
-
         self.points = []
         for i in range(points_count):
             points_offset_i = points_offset + i * NuVec.SIZE
@@ -245,11 +378,52 @@ class NuSpline:
             self.points.append(NuVec(data, points_offset_i))
 
 
+class NuVertexData:
+    HDR_SCHEMA = Schema(("size", 0x00, "I"), ("buf_offset", 0x08, "I"))
+
+    def __init__(self, data, offset):
+        self.data = data
+        self.offset = offset
+        self.count = read_i32(data, offset)
+
+        # Geoms frequently share vertex buffers, so each buffer is decoded once
+        # and shared by every geom that references it.
+        self.decoded = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if i < 0 or i >= self.count:
+            raise IndexError("vertex buffer index out of range")
+
+        return read_vertices(i, self.offset, self.data)
+
+    def decode(self, i, vertex_type):
+        if i < 0:
+            i += self.count
+
+        vertex_buf = self.decoded.get(i)
+        if vertex_buf is not None and vertex_buf.type == vertex_type:
+            self.hits += 1
+            return vertex_buf
+
+        self.misses += 1
+
+        vertex_buf = NuVtxBuffer(self[i], vertex_type)
+        self.decoded[i] = vertex_buf
+
+        return vertex_buf
+
+
 def read_vertices(i, vertex_data_offset, body):
     vertex_hdr_offset = vertex_data_offset + 0x10 + i * 0x0C
 
-    size = read_u32(body, vertex_hdr_offset)
-    buf_offset = read_u32(body, vertex_hdr_offset + 0x08)
+    (size, buf_offset) = NuVertexData.HDR_SCHEMA.unpack(body, vertex_hdr_offset)
 
     buf_offset = vertex_data_offset + buf_offset
 
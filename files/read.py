@@ -1,41 +1,151 @@
+import mmap
+import os
+import re
 import struct
 
+import numpy as np
+
+_U32 = struct.Struct("<I")
+_I32 = struct.Struct("<i")
+_F32 = struct.Struct("<f")
+_I16 = struct.Struct("<h")
+_U16 = struct.Struct("<H")
+_U8 = struct.Struct("<B")
+
 
 def read_u32(data, offset):
-    (u32,) = struct.unpack_from("<I", data, offset)
+    (u32,) = _U32.unpack_from(data, offset)
     return u32
 
 
 def read_i32(data, offset):
-    (i32,) = struct.unpack_from("<i", data, offset)
+    (i32,) = _I32.unpack_from(data, offset)
     return i32
 
 
 def read_f32(data, offset):
-    (f32,) = struct.unpack_from("<f", data, offset)
+    (f32,) = _F32.unpack_from(data, offset)
     return f32
 
 
 def read_i16(data, offset):
-    (i16,) = struct.unpack_from("<h", data, offset)
+    (i16,) = _I16.unpack_from(data, offset)
     return i16
 
 
 def read_u16(data, offset):
-    (u16,) = struct.unpack_from("<H", data, offset)
+    (u16,) = _U16.unpack_from(data, offset)
     return u16
 
 
 def read_u8(data, offset):
-    (u8,) = struct.unpack_from("<B", data, offset)
+    (u8,) = _U8.unpack_from(data, offset)
     return u8
 
 
 def read_string(data, offset):
-    str_bytes = bytearray()
+    # Search for the terminator a chunk at a time, since memoryviews don't
+    # support find().
+    str_bytes = b""
+
+    while True:
+        chunk = bytes(data[offset : offset + 0x40])
+        if len(chunk) == 0:
+            raise IndexError("unterminated string")
 
-    while data[offset] != 0:
-        str_bytes.append(data[offset])
-        offset += 1
+        end = chunk.find(b"\0")
+        if end != -1:
+            str_bytes += chunk[:end]
+            break
+
+        str_bytes += chunk
+        offset += len(chunk)
 
     return str_bytes.decode("ascii")
+
+
+def map_file(path):
+    # Map the file read-only rather than reading it in, so that parsed data can
+    # refer to views into the file instead of copies. The mapping is released
+    # once no views of it remain.
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return memoryview(b"")
+
+        return memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+class Schema:
+    # The layout of a fixed-size record, given as `(name, offset, format)`
+    # fields in offset order, where format is a little-endian struct code such
+    # as "I" or "3f". The fields are compiled to a single struct.Struct, with
+    # padding for any gaps, so a record is unpacked in one call. Fields with a
+    # repeat count contribute that many values to the unpacked tuple.
+
+    def __init__(self, *fields):
+        self.fields = fields
+
+        layout = "<"
+        end = 0
+        for name, offset, fmt in fields:
+            if offset < end:
+                raise ValueError("field {} overlaps the previous field".format(name))
+            elif offset > end:
+                layout += "{}x".format(offset - end)
+
+            layout += fmt
+            end = struct.calcsize(layout)
+
+        self.struct = struct.Struct(layout)
+        self.size = self.struct.size
+
+    def unpack(self, data, offset):
+        return self.struct.unpack_from(data, offset)
+
+    # NumPy equivalents of the struct codes that fields use.
+    DTYPE_CODES = {
+        "b": "i1",
+        "B": "u1",
+        "h": "<i2",
+        "H": "<u2",
+        "i": "<i4",
+        "I": "<u4",
+        "f": "<f4",
+    }
+
+    def dtype(self, itemsize=None):
+        # The same layout as a NumPy structured dtype, for decoding a whole
+        # table of records at once. Fields with a repeat count become
+        # subarrays.
+        formats = []
+        for name, offset, fmt in self.fields:
+            (count, code) = re.fullmatch(r"(\d*)(\w)", fmt).groups()
+            if count:
+                formats.append((Schema.DTYPE_CODES[code], (int(count),)))
+            else:
+                formats.append(Schema.DTYPE_CODES[code])
+
+        return np.dtype(
+            {
+                "names": [name for name, _, _ in self.fields],
+                "formats": formats,
+                "offsets": [offset for _, offset, _ in self.fields],
+                "itemsize": itemsize or self.size,
+            }
+        )
+
+    def shifted(self, shift, fixed=()):
+        # Copy of this schema with every field not named in `fixed` moved by
+        # `shift` bytes.
+        return Schema(
+            *(
+                (name, offset if name in fixed else offset + shift, fmt)
+                for name, offset, fmt in self.fields
+            )
+        )
+
+    def per_platform(self, platform_offsets, fixed=()):
+        return {
+            platform: self.shifted(shift, fixed)
+            for platform, shift in platform_offsets.items()
+        }
@@ -21,14 +21,23 @@ class Ter:
 
 
 class NuSitu:
+    SCHEMA = Schema(
+        ("offset_to_next", 0x00, "I"),
+        ("location", 0x04, "3f"),
+        ("type", 0x10, "H"),
+        ("flags", 0x28, "H"),
+        ("id", 0x2E, "h"),
+    )
+
     groups = None
 
     def __init__(self, data, offset, model_offset):
-        self.offset_to_next = read_u32(data, offset)
-        self.location = NuVec(data, offset + 0x04)
-        self.type = TerType(read_u16(data, offset + 0x10))
-        self.flags = read_u16(data, offset + 0x28)
-        self.id = read_i16(data, offset + 0x2E)
+        values = NuSitu.SCHEMA.unpack(data, offset)
+
+        self.offset_to_next = values[0]
+        self.location = NuVec.from_values(*values[1:4])
+        self.type = TerType(values[4])
+        (self.flags, self.id) = values[5:7]
 
         if self.type == TerType.NORMAL or self.type == TerType.PLATFORM:
             self.groups = []
@@ -74,12 +83,16 @@ class NuWallSpline:
 
 
 class NuTerGroup:
+    SCHEMA = Schema(
+        ("ter_count", 0x02, "h"),
+        ("minx", 0x04, "f"),
+        ("minz", 0x08, "f"),
+        ("maxx", 0x0C, "f"),
+        ("maxz", 0x10, "f"),
+    )
+
     def __init__(self, data, offset):
-        ter_count = read_i16(data, offset + 0x02)
-        minx = read_f32(data, offset + 0x04)
-        minz = read_f32(data, offset + 0x08)
-        maxx = read_f32(data, offset + 0x0C)
-        maxz = read_f32(data, offset + 0x10)
+        (ter_count, minx, minz, maxx, maxz) = NuTerGroup.SCHEMA.unpack(data, offset)
 
         self.ters = []
         for i in range(ter_count):
@@ -93,10 +106,20 @@ class NuTerGroup:
 class NuTer:
     SIZE = 0x64
 
+    SCHEMA = Schema(
+        ("points", 0x18, "12f"),
+        ("norms", 0x48, "6f"),
+        ("info", 0x60, "4B"),
+    )
+
+    __slots__ = ("norms", "points", "info")
+
     def __init__(self, data, offset):
+        values = NuTer.SCHEMA.unpack(data, offset)
+
         self.norms = []
         for i in range(2):
-            self.norms.append(NuVec(data, offset + 0x48 + i * NuVec.SIZE))
+            self.norms.append(NuVec.from_values(*values[12 + i * 3 : 15 + i * 3]))
 
         # An invalid second normal is used to indicate that the surface is a
         # triangle instead of a full quad.
@@ -107,11 +130,9 @@ class NuTer:
 
         self.points = []
         for i in range(point_count):
-            self.points.append(NuVec(data, offset + 0x18 + i * NuVec.SIZE))
+            self.points.append(NuVec.from_values(*values[i * 3 : i * 3 + 3]))
 
-        self.info = []
-        for i in range(4):
-            self.info.append(read_u8(data, offset + 0x60 + i))
+        self.info = list(values[18:22])
 
     def __repr__(self):
         return "NuTer(points = {}, info = {})".format(self.points, self.info)
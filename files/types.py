@@ -1,7 +1,149 @@
-class Texture:
-    def __init__(self, data, offset, size, header):
-        self.data = data[offset : offset + size]
-        self.width = header.width
-        self.height = header.height
-        self.levels = header.levels
-        self.type = header.type
+from .dds import DdsHeader, flip_blocks
+from .nu import NuTextureType
+
+
+class Texture:
+    # Bytes per 4x4 block of the block-compressed texture types.
+    BLOCK_SIZES = {NuTextureType.DXT1: 0x08, NuTextureType.DXT5: 0x10}
+
+    # DDS formats of the block-compressed texture types.
+    FOUR_CCS = {NuTextureType.DXT1: b"DXT1", NuTextureType.DXT5: b"DXT5"}
+
+    def __init__(self, data, offset, size, width, height, levels, texture_type):
+        self.offset = offset
+        self.size = size
+        self.data = data[offset : offset + size]
+        self.width = width
+        self.height = height
+        self.levels = levels
+        self.type = texture_type
+
+    @staticmethod
+    def level_size(width, height, level, block_size):
+        blocks_x = (max(1, width >> level) + 3) // 4
+        blocks_y = (max(1, height >> level) + 3) // 4
+        return blocks_x * blocks_y * block_size
+
+    @staticmethod
+    def payload_size(width, height, levels, texture_type):
+        # Exact size of the payload, summed over the mip chain, or None when it
+        # can't be derived from the header (DDS payloads carry their own
+        # header).
+        block_size = Texture.BLOCK_SIZES.get(texture_type)
+        if block_size is None:
+            return None
+
+        return sum(
+            Texture.level_size(width, height, level, block_size)
+            for level in range(max(levels, 1))
+        )
+
+    def mip_chain(self):
+        # The layout of the block-compressed mip chain in the payload, as
+        # (width, height, block size, offset of level 0, level sizes), or None
+        # if the payload isn't one we can split into levels. Levels that don't
+        # fit in the payload are left out.
+        if self.type == NuTextureType.DDS:
+            try:
+                dds_header = DdsHeader(self.data)
+            except ValueError:
+                return None
+
+            if dds_header.block_size is None:
+                return None
+
+            width = dds_header.width
+            height = dds_header.height
+            levels = dds_header.levels
+            block_size = dds_header.block_size
+            offset = DdsHeader.SIZE
+        else:
+            width = self.width
+            height = self.height
+            levels = self.levels
+            block_size = Texture.BLOCK_SIZES[self.type]
+            offset = 0
+
+        level_sizes = []
+        end = offset
+        for level in range(max(levels, 1)):
+            level_size = Texture.level_size(width, height, level, block_size)
+            end += level_size
+            if end > len(self.data):
+                break
+
+            level_sizes.append(level_size)
+
+        return (width, height, block_size, offset, level_sizes)
+
+    def select_level(self, level=0, max_size=0):
+        # The mip level to use for the requested level, or the first level at
+        # or below it with no dimension over `max_size`, if given. Clamped to
+        # the levels present in the payload.
+        mip_chain = self.mip_chain()
+        if mip_chain is None:
+            return 0
+
+        (width, height, _, _, level_sizes) = mip_chain
+        last_level = max(len(level_sizes) - 1, 0)
+
+        level = min(level, last_level)
+        while (
+            max_size > 0
+            and level < last_level
+            and max(width >> level, height >> level) > max_size
+        ):
+            level += 1
+
+        return level
+
+    def level_dimensions(self, level):
+        return (max(1, self.width >> level), max(1, self.height >> level))
+
+    def level(self, level):
+        # The dimensions and data of one mip level, as a view of the payload.
+        # DXT1 and DXT5 data is raw blocks, and DDS data is a DDS file, which
+        # for levels past 0 is the level's blocks behind a new header.
+        if level == 0:
+            return (self.width, self.height, self.data)
+
+        (width, height, block_size, offset, level_sizes) = self.mip_chain()
+        offset += sum(level_sizes[:level])
+        data = self.data[offset : offset + level_sizes[level]]
+        (width, height) = (max(1, width >> level), max(1, height >> level))
+
+        if self.type == NuTextureType.DDS:
+            dds_header = DdsHeader(self.data)
+            data = DdsHeader.pack(width, height, 1, dds_header.four_cc) + data
+
+        return (width, height, data)
+
+    def dds_file(self, level):
+        # One mip level as a DDS file that Blender can load itself, or None if
+        # the payload isn't block-compressed. Decoded textures are uploaded top
+        # row first, which Blender takes as the bottom row, and UVs are used to
+        # match. Blender loads DDS files the right way up, so the blocks are
+        # flipped to give the same orientation.
+        mip_chain = self.mip_chain()
+        if mip_chain is None:
+            return None
+
+        (width, height, block_size, offset, level_sizes) = mip_chain
+        if level >= len(level_sizes):
+            return None
+
+        if self.type == NuTextureType.DDS:
+            four_cc = DdsHeader(self.data).four_cc
+        else:
+            four_cc = Texture.FOUR_CCS[self.type]
+
+        offset += sum(level_sizes[:level])
+        (width, height) = (max(1, width >> level), max(1, height >> level))
+
+        data = flip_blocks(
+            self.data[offset : offset + level_sizes[level]], width, height, four_cc
+        )
+        if data is None:
+            return None
+
+        return DdsHeader.pack(width, height, 1, four_cc) + data
@@ -0,0 +1,217 @@
+import bpy
+import numpy as np
+
+from .files.nu import NuPrimType
+
+# Mesh construction for the importer. The geometry of an object is collected
+# as flat arrays, which are written to a Blender mesh in a handful of bulk
+# calls instead of one bmesh call per vertex, face and loop.
+
+
+class MeshBuilder:
+    def __init__(self, compact=False):
+        # Whether to store colours and UVs per vertex rather than per face
+        # corner. UVs are then a generic attribute rather than a UV map.
+        self.compact = compact
+
+        self.vertex_count = 0
+
+        # Per-geom arrays, joined when the mesh is built.
+        self.positions = []
+        self.normals = []
+        self.uvs = []
+        self.colours = []
+        self.triangles = []
+        self.material_indices = []
+        self.edges = []
+
+        # Prims of a type we don't know, and triangles and edges referring to
+        # vertices past the end of their geom, which are left out of the mesh.
+        self.skipped_prims = 0
+        self.skipped_elements = 0
+
+    def add_geom(self, geom, material_index):
+        # Add the vertices of a geom, and the triangles and edges of its
+        # prims. Vertices are added whether or not any prim uses them, so
+        # point prims need nothing more.
+        vertex_buf = geom.vertex_buf
+        base_index = self.vertex_count
+
+        triangles = [np.empty((0, 3), np.int32)]
+        edges = [np.empty((0, 2), np.int32)]
+        for prim in geom.prims:
+            if prim.type is None:
+                self.skipped_prims += 1
+                continue
+
+            if prim.type.indexed():
+                indices = prim.index_buf
+            else:
+                # Non-indexed prims are taken to start at the first vertex of
+                # the geom. Any vertices they run past the end of the buffer
+                # are caught with the other bad indices below.
+                indices = np.arange(prim.count)
+
+            match prim.type:
+                case NuPrimType.TRI | NuPrimType.NDXTRI:
+                    triangles.append(list_triangles(indices))
+                case NuPrimType.TRISTRIP | NuPrimType.NDXTRISTRIP:
+                    triangles.append(strip_triangles(indices))
+                case NuPrimType.LINE | NuPrimType.NDXLINE:
+                    edges.append(list_edges(indices))
+
+        # An index past the end of the vertex buffer would make an invalid
+        # mesh, so anything using one is dropped.
+        triangles = np.concatenate(triangles)
+        edges = np.concatenate(edges)
+        valid_triangles = (triangles < vertex_buf.count).all(axis=1)
+        valid_edges = (edges < vertex_buf.count).all(axis=1)
+        self.skipped_elements += int((~valid_triangles).sum() + (~valid_edges).sum())
+
+        # Vertices aren't shared between geoms, so duplicate faces can only
+        # come from the same geom.
+        triangles = unique_triangles(triangles[valid_triangles])
+
+        self.positions.append(vertex_buf.positions)
+        self.normals.append(vertex_buf.normals)
+        self.uvs.append(vertex_buf.uvs)
+        self.colours.append(vertex_buf.colours)
+        self.triangles.append(triangles + base_index)
+        self.material_indices.append(
+            np.full(len(triangles), material_index, dtype=np.int32)
+        )
+        self.edges.append(edges[valid_edges] + base_index)
+
+        self.vertex_count += vertex_buf.count
+
+    def build(self, name, materials):
+        mesh = bpy.data.meshes.new(name)
+
+        for material in materials:
+            mesh.materials.append(material)
+
+        if self.vertex_count == 0:
+            return mesh
+
+        positions = np.concatenate(self.positions)
+        triangles = np.concatenate(self.triangles)
+        corners = triangles.ravel()
+
+        mesh.vertices.add(len(positions))
+        mesh.vertices.foreach_set("co", positions.ravel())
+
+        mesh.loops.add(len(corners))
+        mesh.loops.foreach_set("vertex_index", corners)
+
+        mesh.polygons.add(len(triangles))
+        mesh.polygons.foreach_set(
+            "loop_start", np.arange(0, len(corners), 3, dtype=np.int32)
+        )
+        mesh.polygons.foreach_set(
+            "material_index", np.concatenate(self.material_indices)
+        )
+
+        # Edges of line prims are added as loose edges. Edges of faces are
+        # added after them when the mesh is updated, reusing any that match.
+        edges = unique_edges(np.concatenate(self.edges))
+        mesh.edges.add(len(edges))
+        mesh.edges.foreach_set("vertices", edges.ravel())
+
+        if len(triangles) != 0:
+            # UVs and colours belong to vertices. Unless the mesh is compact,
+            # they're spread to the face corners. Colours are written as sRGB
+            # to keep the bytes as they are.
+            uvs = np.concatenate(self.uvs)
+            colours = np.concatenate(self.colours)
+
+            if self.compact:
+                uv_layer = mesh.attributes.new("UVMap", "FLOAT2", "POINT")
+                uv_layer.data.foreach_set("vector", uvs.ravel())
+                colour_domain = "POINT"
+            else:
+                uv_layer = mesh.uv_layers.new(name="UVMap")
+                uv_layer.data.foreach_set("uv", uvs[corners].ravel())
+                colours = colours[corners]
+                colour_domain = "CORNER"
+
+            colour_layer = mesh.color_attributes.new("Col", "BYTE_COLOR", colour_domain)
+            colour_layer.data.foreach_set(
+                "color_srgb", (colours / np.float32(0xFF)).ravel()
+            )
+
+        mesh.update(calc_edges=True)
+
+        if len(triangles) != 0:
+            # Use the game's vertex normals as custom normals, which only
+            # apply to smooth faces.
+            mesh.shade_smooth()
+            mesh.normals_split_custom_set_from_vertices(np.concatenate(self.normals))
+
+        return mesh
+
+
+def list_triangles(index_buf):
+    # Split a triangle list into an array of triangles, skipping degenerate
+    # ones. Triangles are reversed to match the winding of strips.
+    index_buf = np.asarray(index_buf, dtype=np.int32)
+    count = len(index_buf) // 3
+
+    triangles = index_buf[: count * 3].reshape(count, 3)[:, [0, 2, 1]]
+    return triangles[~degenerate_triangles(triangles)]
+
+
+def strip_triangles(index_buf):
+    # Break a triangle strip into an array of triangles, skipping degenerate
+    # ones. Every other triangle is reversed to keep the winding order
+    # consistent, starting with the first.
+    index_buf = np.asarray(index_buf, dtype=np.int32)
+    count = max(len(index_buf) - 2, 0)
+
+    triangles = np.empty((count, 3), dtype=np.int32)
+    triangles[:, 0] = index_buf[:count]
+    triangles[0::2, 1] = index_buf[2 : count + 2 : 2]
+    triangles[0::2, 2] = index_buf[1 : count + 1 : 2]
+    triangles[1::2, 1] = index_buf[2 : count + 1 : 2]
+    triangles[1::2, 2] = index_buf[3 : count + 2 : 2]
+
+    # Skip degenerate triangles. We deliberately do this after flipping the
+    # winding.
+    return triangles[~degenerate_triangles(triangles)]
+
+
+def degenerate_triangles(triangles):
+    return (
+        (triangles[:, 0] == triangles[:, 1])
+        | (triangles[:, 0] == triangles[:, 2])
+        | (triangles[:, 1] == triangles[:, 2])
+    )
+
+
+def unique_triangles(triangles):
+    # Drop triangles over the same vertices as an earlier one, whatever their
+    # winding. Each triangle's sorted vertex indices are packed into one
+    # integer, which is cheaper to find duplicates of than rows.
+    corners = np.sort(triangles, axis=1).astype(np.int64)
+    keys = (corners[:, 0] << 42) | (corners[:, 1] << 21) | corners[:, 2]
+
+    (_, first) = np.unique(keys, return_index=True)
+    return triangles[np.sort(first)]
+
+
+def list_edges(index_buf):
+    # Split a line list into an array of edges, skipping zero-length ones.
+    index_buf = np.asarray(index_buf, dtype=np.int32)
+    count = len(index_buf) // 2
+
+    edges = index_buf[: count * 2].reshape(count, 2)
+    return edges[edges[:, 0] != edges[:, 1]]
+
+
+def unique_edges(edges):
+    # Drop edges between the same vertices as an earlier one, in either
+    # direction.
+    corners = np.sort(edges, axis=1).astype(np.int64)
+    keys = (corners[:, 0] << 32) | corners[:, 1]
+
+    (_, first) = np.unique(keys, return_index=True)
+    return edges[np.sort(first)]
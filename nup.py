@@ -1,21 +1,24 @@
 import bmesh
 import bpy
-import io
 import math
 import mathutils
 import os
-from PIL import Image
+import shutil
+import tempfile
 
-from .files.nup import Nup, NuPrimType, RtlSet, RtlType
+from .files.cache import SceneCache
+from .files.nup import Nup, RtlSet, RtlType
 from .files.nu import (
     NuAlphaMode,
     NuAlphaTest,
     NuAlphaTestMapping,
     NuAnimComponent,
     NuPlatform,
-    NuTextureType,
 )
+from .files.read import map_file
 from .files.ter import Ter, TerType
+from .mesh import MeshBuilder
+from .textures import TextureCache, decode_textures, float_pixels, texture_key
 
 
 def import_nup(context, operator: bpy.types.Operator):
@@ -31,6 +34,20 @@ def import_nup(context, operator: bpy.types.Operator):
         case _:
             platform = None
 
+    # Load scene files, including scene definition, lights, and configuration.
+    data = map_file(operator.filepath)
+
+    if operator.use_scene_cache:
+        scene_cache = SceneCache(
+            get_cache_dir(operator, "scenes"), operator.scene_cache_size * 0x100000
+        )
+        (nup, cached) = scene_cache.load(data, platform)
+
+        if cached:
+            operator.report({"INFO"}, "Loaded parsed scene from cache.")
+    else:
+        nup = Nup(data, platform)
+
     # Warn if platform doesn't match.
     if nup.platform != platform:
         operator.report(
@@ -38,11 +55,6 @@ def import_nup(context, operator: bpy.types.Operator):
             f"Warning: Detected platform {nup.platform} does not match expected platform {platform} based on file extension.",
         )
 
-    # Load scene files, including scene definition, lights, and configuration.
-    with open(operator.filepath, "rb") as file:
-        data = file.read()
-        nup = Nup(data, platform)
-
     bpy.ops.scene.new()
 
     scene = bpy.context.scene
@@ -54,32 +66,7 @@ def import_nup(context, operator: bpy.types.Operator):
     terrain_layer = scene.view_layers.new("Terrain")
     terrain_layer.use = False
 
-    image_names = []
-    for texture in nup.textures:
-        match texture.type:
-            case NuTextureType.DXT1:
-                decoder = "DXT1"
-            case NuTextureType.DXT5:
-                decoder = "DXT5"
-            case NuTextureType.DDS:
-                decoder = None
-
-        if decoder == None:
-            image = Image.open(io.BytesIO(texture.data), formats=["DDS"])
-        else:
-            image = Image.frombytes(
-                "RGBA", (texture.width, texture.height), texture.data, decoder
-            )
-        image_data = image.getdata()
-
-        blend_img = bpy.data.images.new(
-            "Texture", texture.width, texture.height, alpha=True
-        )
-        blend_img.pixels = [item / 255.0 for t in image_data for item in t]
-        blend_img.file_format = "PNG"
-        blend_img.pack()
-
-        image_names.append(blend_img.name)
+    image_names = import_textures(operator, nup.textures, scene_name)
 
     # Get alpha test mapping for platform.
     atst_mapping = NuAlphaTestMapping.PLATFORM_MAPPING[nup.platform or platform]
@@ -193,6 +180,16 @@ def import_nup(context, operator: bpy.types.Operator):
             texture_node = node_tree.nodes.new("ShaderNodeTexImage")
             texture_node.image = bpy.data.images[image_names[material.texture_idx]]
 
+            # Compact meshes have their UVs in a generic attribute, which the
+            # texture doesn't pick up by itself.
+            if operator.use_compact_attributes:
+                uv_node = node_tree.nodes.new("ShaderNodeAttribute")
+                uv_node.attribute_name = "UVMap"
+
+                node_tree.links.new(
+                    uv_node.outputs["Vector"], texture_node.inputs["Vector"]
+                )
+
             # Multiply texture color and vertex color for the final unlighted
             # color. This is not game-accurate, but a quick approximation.
             color_mix_node = node_tree.nodes.new("ShaderNodeMixRGB")
@@ -363,17 +360,18 @@ def import_nup(context, operator: bpy.types.Operator):
             # its animations. In order to correctly replicate the effect on
             # rotations, we reconstruct the final transform for each keyframe
             # and decompose it back into its channels for Blender.
-            curveset = anim.chunks[chunk_idx].curvesets[0]
+            chunk = anim.chunks[chunk_idx]
+            curveset = chunk.curvesets[0]
 
             if curveset.has_rotation:
                 x_rot = curveset_key_for_frame(
-                    curveset, NuAnimComponent.X_ROTATION, frame_in_chunk
+                    chunk, curveset, NuAnimComponent.X_ROTATION, frame_in_chunk
                 )
                 y_rot = curveset_key_for_frame(
-                    curveset, NuAnimComponent.Y_ROTATION, frame_in_chunk
+                    chunk, curveset, NuAnimComponent.Y_ROTATION, frame_in_chunk
                 )
                 z_rot = curveset_key_for_frame(
-                    curveset, NuAnimComponent.Z_ROTATION, frame_in_chunk
+                    chunk, curveset, NuAnimComponent.Z_ROTATION, frame_in_chunk
                 )
 
                 rotation = mathutils.Euler((x_rot, y_rot, z_rot), "XYZ")
@@ -382,13 +380,13 @@ def import_nup(context, operator: bpy.types.Operator):
 
             if curveset.has_scale:
                 x_scale = curveset_key_for_frame(
-                    curveset, NuAnimComponent.X_SCALE, frame_in_chunk
+                    chunk, curveset, NuAnimComponent.X_SCALE, frame_in_chunk
                 )
                 y_scale = curveset_key_for_frame(
-                    curveset, NuAnimComponent.Y_SCALE, frame_in_chunk
+                    chunk, curveset, NuAnimComponent.Y_SCALE, frame_in_chunk
                 )
                 z_scale = curveset_key_for_frame(
-                    curveset, NuAnimComponent.Z_SCALE, frame_in_chunk
+                    chunk, curveset, NuAnimComponent.Z_SCALE, frame_in_chunk
                 )
 
                 scale = mathutils.Vector((x_scale, y_scale, z_scale))
@@ -396,13 +394,13 @@ def import_nup(context, operator: bpy.types.Operator):
                 scale = mathutils.Vector((1.0, 1.0, 1.0))
 
             x = curveset_key_for_frame(
-                curveset, NuAnimComponent.X_TRANSLATION, frame_in_chunk
+                chunk, curveset, NuAnimComponent.X_TRANSLATION, frame_in_chunk
             )
             y = curveset_key_for_frame(
-                curveset, NuAnimComponent.Y_TRANSLATION, frame_in_chunk
+                chunk, curveset, NuAnimComponent.Y_TRANSLATION, frame_in_chunk
             )
             z = curveset_key_for_frame(
-                curveset, NuAnimComponent.Z_TRANSLATION, frame_in_chunk
+                chunk, curveset, NuAnimComponent.Z_TRANSLATION, frame_in_chunk
             )
 
             transform = mathutils.Matrix.LocRotScale(
@@ -488,28 +486,17 @@ def import_nup(context, operator: bpy.types.Operator):
             instances_by_obj[instance.obj_idx].append(instance)
 
     # Transform NUP gobjs to Blender meshes.
+    skipped_prims = 0
+    skipped_elements = 0
     for obj_idx, obj in enumerate(nup.scene.objects):
-        blend_mesh = bmesh.new()
-        geom = obj.geom
+        mesh_builder = MeshBuilder(operator.use_compact_attributes)
 
         nu_mtl_idx_to_blend = {}
         mesh_materials = []
 
-        # Iterate through geometry, adding vertices for each geom and breaking
-        # each primitive into triangles, for which we add faces.
-        while geom is not None:
-            base_index = len(blend_mesh.verts)
-
-            for vertex in geom.vertices:
-                blend_vert = blend_mesh.verts.new(
-                    (vertex.position.x, vertex.position.y, vertex.position.z)
-                )
-                blend_vert.normal = mathutils.Vector(
-                    (vertex.normal.x, vertex.normal.y, vertex.normal.z)
-                )
-
-            blend_mesh.verts.ensure_lookup_table()
-
+        # Collect the vertices of each geom and the triangles of its
+        # primitives, then build the mesh from them in one go.
+        for geom in obj.geoms:
             blend_mat_idx = nu_mtl_idx_to_blend.get(geom.material_idx)
             if blend_mat_idx is None:
                 blend_mat_idx = len(mesh_materials)
@@ -519,96 +506,11 @@ def import_nup(context, operator: bpy.types.Operator):
                     bpy.data.materials[material_names[geom.material_idx]]
                 )
 
-            prim = geom.prim
-
-            while prim is not None:
-                if prim.type == NuPrimType.NDXTRISTRIP:
-                    # Convert triangle strip to triangles and add faces.
-                    should_reverse = True
-                    for i in range(len(prim.index_buf) - 2):
-                        # Preserve winding order. No idea if Blender cares about
-                        # it.
-                        if should_reverse:
-                            corners = [
-                                prim.index_buf[i],
-                                prim.index_buf[i + 2],
-                                prim.index_buf[i + 1],
-                            ]
-                        else:
-                            corners = [
-                                prim.index_buf[i],
-                                prim.index_buf[i + 1],
-                                prim.index_buf[i + 2],
-                            ]
-
-                        should_reverse = not should_reverse
-
-                        corners_global = [corner + base_index for corner in corners]
-
-                        # Skip degenerate triangles. We deliberately do this
-                        # after flipping the winding.
-                        if (
-                            corners[0] == corners[1]
-                            or corners[0] == corners[2]
-                            or corners[1] == corners[2]
-                        ):
-                            continue
-
-                        if (
-                            blend_mesh.faces.get(
-                                (
-                                    blend_mesh.verts[corners_global[0]],
-                                    blend_mesh.verts[corners_global[1]],
-                                    blend_mesh.verts[corners_global[2]],
-                                )
-                            )
-                            is not None
-                        ):
-                            continue
+            mesh_builder.add_geom(geom, blend_mat_idx)
 
-                        # Add a new Blender face for this triangle.
-                        face = blend_mesh.faces.new(
-                            (
-                                blend_mesh.verts[corners_global[0]],
-                                blend_mesh.verts[corners_global[1]],
-                                blend_mesh.verts[corners_global[2]],
-                            )
-                        )
-
-                        face.material_index = blend_mat_idx
-
-                        uv_layer = blend_mesh.loops.layers.uv.verify()
-                        color_layer = blend_mesh.loops.layers.color.verify()
-
-                        for i, loop in enumerate(face.loops):
-                            vert = corners[i]
-
-                            vertex = geom.vertices[vert]
-
-                            loop[uv_layer].uv[0] = vertex.uv[0]
-                            loop[uv_layer].uv[1] = vertex.uv[1]
-
-                            vert_color = vertex.colour
-                            loop[color_layer] = (
-                                vert_color.r,
-                                vert_color.g,
-                                vert_color.b,
-                                vert_color.a,
-                            )
-                else:
-                    return {"CANCELLED"}
-
-                prim = prim.next
-
-            geom = geom.next
-
-        mesh = bpy.data.meshes.new("Object")
-
-        for material in mesh_materials:
-            mesh.materials.append(material)
-
-        blend_mesh.to_mesh(mesh)
-        blend_mesh.free()
+        mesh = mesh_builder.build("Object", mesh_materials)
+        skipped_prims += mesh_builder.skipped_prims
+        skipped_elements += mesh_builder.skipped_elements
 
         # Create an object for each instance of this gobj.
         for instance in instances_by_obj.get(obj_idx, []):
@@ -662,6 +564,23 @@ def import_nup(context, operator: bpy.types.Operator):
             if not instance.is_visible:
                 obj.hide_set(True, view_layer=obj_layer)
 
+    if skipped_prims != 0:
+        operator.report(
+            {"WARNING"}, f"Skipped {skipped_prims} primitives of unknown type."
+        )
+
+    if skipped_elements != 0:
+        operator.report(
+            {"WARNING"},
+            f"Skipped {skipped_elements} triangles and lines with out of range vertex indices.",
+        )
+
+    vertex_bufs = nup.vertex_bufs
+    operator.report(
+        {"INFO"},
+        f"Vertex buffers: {vertex_bufs.misses} decoded, {vertex_bufs.hits} shared between geoms.",
+    )
+
     for spline in nup.scene.splines:
         curve = bpy.data.curves.new(spline.name, "CURVE")
         blend_spline = curve.splines.new("POLY")
@@ -722,12 +641,11 @@ def import_nup(context, operator: bpy.types.Operator):
 
     scene.world = world
 
-    file = open_i(path, scene_name + ".rtl", "rb")
-    if file is None:
+    file_path = find_i(path, scene_name + ".rtl")
+    if file_path is None:
         return {"FINISHED"}
 
-    data = file.read()
-    file.close()
+    data = map_file(file_path)
 
     rtl = RtlSet(data)
 
@@ -767,12 +685,11 @@ def import_nup(context, operator: bpy.types.Operator):
 
             bpy.context.collection.objects.link(obj)
 
-    file = open_i(path, scene_name + ".ter", "rb")
-    if file is None:
+    file_path = find_i(path, scene_name + ".ter")
+    if file_path is None:
         return {"FINISHED"}
 
-    data = file.read()
-    file.close()
+    data = map_file(file_path)
 
     ter = Ter(data)
 
@@ -842,30 +759,137 @@ def import_nup(context, operator: bpy.types.Operator):
     return {"FINISHED"}
 
 
-def open_i(path, filename, mode):
+def import_textures(operator, textures, scene_name):
+    # Create an image for each texture, returning the image names by texture
+    # index.
+
+    # Only the blocks of the selected mip level of each texture are used.
+    levels = [
+        texture.select_level(operator.texture_level, operator.max_texture_size)
+        for texture in textures
+    ]
+
+    # Scenes often carry identical textures at several indices, so each unique
+    # texture is imported once and its image shared between them.
+    texture_keys = [
+        texture_key(texture, level) for texture, level in zip(textures, levels)
+    ]
+    unique_textures = {}
+    for i, key in enumerate(texture_keys):
+        unique_textures.setdefault(key, i)
+
+    image_names_by_key = {}
+
+    # In the DDS modes, block-compressed textures are written out as DDS files
+    # and loaded by Blender, skipping decoding and PNG packing. Anything else
+    # is still decoded. Each file is released once its image is loaded.
+    decode_keys = []
+    dds_dir = None
+    # The temporary directory of packed DDS files is removed even if loading
+    # fails partway.
+    try:
+        for key, i in unique_textures.items():
+            dds_file = None
+            if operator.texture_mode != "DECODE":
+                dds_file = textures[i].dds_file(levels[i])
+
+            if dds_file is None:
+                decode_keys.append(key)
+                continue
+
+            if dds_dir is None:
+                if operator.texture_mode == "DDS_PACKED":
+                    dds_dir = tempfile.mkdtemp()
+                else:
+                    dds_dir = os.path.join(get_cache_dir(operator, "dds"), scene_name)
+                    os.makedirs(dds_dir, exist_ok=True)
+
+            dds_path = os.path.join(dds_dir, key + ".dds")
+            with open(dds_path, "wb") as file:
+                file.write(dds_file)
+
+            blend_img = bpy.data.images.load(dds_path)
+            blend_img.name = "Texture"
+            if operator.texture_mode == "DDS_PACKED":
+                blend_img.pack()
+
+            image_names_by_key[key] = blend_img.name
+    finally:
+        if dds_dir is not None and operator.texture_mode == "DDS_PACKED":
+            shutil.rmtree(dds_dir, ignore_errors=True)
+
+    if operator.use_texture_cache:
+        texture_cache = TextureCache(
+            get_cache_dir(operator, "textures"), operator.texture_cache_size * 0x100000
+        )
+    else:
+        texture_cache = None
+
+    # Textures are decoded on worker threads, and only the images are created
+    # here on the main thread. Decoding streams ahead of image creation only as
+    # far as the memory limit allows, and each texture's pixels are released
+    # as soon as its image exists.
+    decoded_textures = decode_textures(
+        [textures[unique_textures[key]] for key in decode_keys],
+        [levels[unique_textures[key]] for key in decode_keys],
+        decode_keys,
+        operator.texture_workers,
+        texture_cache,
+        operator.texture_memory_limit * 0x100000,
+    )
+    for key, (width, height, pixels) in zip(decode_keys, decoded_textures):
+        blend_img = bpy.data.images.new("Texture", width, height, alpha=True)
+        blend_img.pixels.foreach_set(float_pixels(pixels))
+        blend_img.file_format = "PNG"
+        blend_img.pack()
+
+        image_names_by_key[key] = blend_img.name
+        del pixels
+
+    operator.report(
+        {"INFO"},
+        f"Textures: {len(decode_keys)} decoded, {len(unique_textures) - len(decode_keys)} loaded as DDS, {len(texture_keys) - len(unique_textures)} duplicates shared.",
+    )
+
+    if texture_cache is not None:
+        # Entries written during the import are only evicted once it's done.
+        texture_cache.evict()
+        operator.report(
+            {"INFO"},
+            f"Texture cache: {texture_cache.hits} hits, {texture_cache.misses} misses.",
+        )
+
+    return [image_names_by_key[key] for key in texture_keys]
+
+
+def get_cache_dir(operator, name):
+    if operator.cache_dir:
+        return os.path.join(bpy.path.abspath(operator.cache_dir), name)
+
+    return bpy.utils.extension_path_user(
+        __package__, path=os.path.join("cache", name), create=True
+    )
+
+
+def find_i(path, filename):
     filename = filename.lower()
-    real_path = None
 
     for entry in os.listdir(path):
         if entry.lower() == filename:
-            real_path = os.path.join(path, entry)
-            break
-
-    if real_path == None:
-        return None
+            return os.path.join(path, entry)
 
-    return open(real_path, "rb")
+    return None
 
 
-def curveset_key_for_frame(curveset, component, frame):
-    curve = curveset.curves.get(component)
-    if curve is not None:
-        key_idx = curve_key_idx_for_frame(curve, frame)
-        return curve.keys[key_idx].d
+def curveset_key_for_frame(chunk, curveset, component, frame):
+    curve_idx = curveset.curve_indices[component.value]
+    if curve_idx != -1:
+        key_idx = curve_key_idx_for_frame(int(chunk.masks[curve_idx]), frame)
+        return float(chunk.curve_keys(curve_idx)["d"][key_idx])
     else:
-        return curveset.constants[component]
+        return curveset.constants[component.value]
 
 
-def curve_key_idx_for_frame(curve, frame):
+def curve_key_idx_for_frame(mask, frame):
     frame_mask = 1 << frame + 1
-    return (curve.mask & (frame_mask - 1)).bit_count() - 1
+    return (mask & (frame_mask - 1)).bit_count() - 1
@@ -12,132 +12,146 @@ Full text of the CC0 license:
 
 from __future__ import annotations
 
-import struct
-from io import BytesIO
-from typing import IO
-
+import numpy as np
 from PIL import Image, ImageFile
 
 
-def _decode565(bits: int) -> tuple[int, int, int]:
+def _decode565(bits: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     a = ((bits >> 11) & 0x1F) << 3
     b = ((bits >> 5) & 0x3F) << 2
     c = (bits & 0x1F) << 3
     return a, b, c
 
 
-def _c2a(a: int, b: int) -> int:
+def _c2a(a: np.ndarray, b: np.ndarray) -> np.ndarray:
     return (2 * a + b) // 3
 
 
-def _c2b(a: int, b: int) -> int:
+def _c2b(a: np.ndarray, b: np.ndarray) -> np.ndarray:
     return (a + b) // 2
 
 
-def _c3(a: int, b: int) -> int:
+def _c3(a: np.ndarray, b: np.ndarray) -> np.ndarray:
     return (2 * b + a) // 3
 
 
-def _dxt1(data: IO[bytes], width: int, height: int) -> bytes:
-    # TODO implement this function as pixel format in decode.c
-    ret = bytearray(4 * width * height)
-
-    for y in range(0, height, 4):
-        for x in range(0, width, 4):
-            color0, color1, bits = struct.unpack("<HHI", data.read(8))
-
-            r0, g0, b0 = _decode565(color0)
-            r1, g1, b1 = _decode565(color1)
-
-            # Decode this block into 4x4 pixels
-            for j in range(4):
-                for i in range(4):
-                    # get next control op and generate a pixel
-                    control = bits & 3
-                    bits = bits >> 2
-                    if control == 0:
-                        r, g, b, a = r0, g0, b0, 255
-                    elif control == 1:
-                        r, g, b, a = r1, g1, b1, 255
-                    elif control == 2:
-                        if color0 > color1:
-                            r, g, b, a = _c2a(r0, r1), _c2a(g0, g1), _c2a(b0, b1), 255
-                        else:
-                            r, g, b, a = _c2b(r0, r1), _c2b(g0, g1), _c2b(b0, b1), 255
-                    elif control == 3:
-                        if color0 > color1:
-                            r, g, b, a = _c3(r0, r1), _c3(g0, g1), _c3(b0, b1), 255
-                        else:
-                            r, g, b, a = 0, 0, 0, 0
-
-                    idx = 4 * ((y + j) * width + x + i)
-                    ret[idx : idx + 4] = struct.pack("4B", r, g, b, a)
-
-    return bytes(ret)
-
-
-def _dxtc_alpha(a0: int, a1: int, ac0: int, ac1: int, ai: int) -> int:
-    if ai <= 12:
-        ac = (ac0 >> ai) & 7
-    elif ai == 15:
-        ac = (ac0 >> 15) | ((ac1 << 1) & 6)
-    else:
-        ac = (ac1 >> (ai - 16)) & 7
-
-    if ac == 0:
-        alpha = a0
-    elif ac == 1:
-        alpha = a1
-    elif a0 > a1:
-        alpha = ((8 - ac) * a0 + (ac - 1) * a1) // 7
-    elif ac == 6:
-        alpha = 0
-    elif ac == 7:
-        alpha = 0xFF
-    else:
-        alpha = ((6 - ac) * a0 + (ac - 1) * a1) // 5
-
-    return alpha
-
-
-def _dxt5(data: IO[bytes], width: int, height: int) -> bytes:
-    # TODO implement this function as pixel format in decode.c
-    ret = bytearray(4 * width * height)
-
-    for y in range(0, height, 4):
-        for x in range(0, width, 4):
-            a0, a1, ac0, ac1, c0, c1, code = struct.unpack("<2BHI2HI", data.read(16))
-
-            r0, g0, b0 = _decode565(c0)
-            r1, g1, b1 = _decode565(c1)
-
-            for j in range(4):
-                for i in range(4):
-                    ai = 3 * (4 * j + i)
-                    alpha = _dxtc_alpha(a0, a1, ac0, ac1, ai)
-
-                    cc = (code >> 2 * (4 * j + i)) & 3
-                    if cc == 0:
-                        r, g, b = r0, g0, b0
-                    elif cc == 1:
-                        r, g, b = r1, g1, b1
-                    elif cc == 2:
-                        r, g, b = _c2a(r0, r1), _c2a(g0, g1), _c2a(b0, b1)
-                    elif cc == 3:
-                        r, g, b = _c3(r0, r1), _c3(g0, g1), _c3(b0, b1)
-
-                    idx = 4 * ((y + j) * width + x + i)
-                    ret[idx : idx + 4] = struct.pack("4B", r, g, b, alpha)
-
-    return bytes(ret)
+def _blocks(data: bytes, width: int, height: int, dtype: np.dtype) -> np.ndarray:
+    # One record per 4x4 block, in rows of blocks. Partial blocks at the right
+    # and bottom edges are stored whole.
+    blocks_x = (width + 3) // 4
+    blocks_y = (height + 3) // 4
+    count = blocks_x * blocks_y
+
+    if len(data) < count * dtype.itemsize:
+        msg = "not enough block data"
+        raise ValueError(msg)
+
+    return np.frombuffer(data, dtype, count).reshape(blocks_y, blocks_x)
+
+
+def _indices(bits: np.ndarray, width: int, count: int) -> np.ndarray:
+    # Split packed per-pixel indices of `width` bits into one index per pixel,
+    # in the order the pixels of a block are stored.
+    shifts = np.arange(0, width * count, width, dtype=bits.dtype)
+    return (bits[..., None] >> shifts) & ((1 << width) - 1)
+
+
+def _pixels(blocks: np.ndarray, width: int, height: int) -> bytes:
+    # Scatter the 16 RGBA pixels of each block, given as u32s, into the image,
+    # cropping any partial blocks.
+    blocks_y, blocks_x = blocks.shape[:2]
+    image = blocks.reshape(blocks_y, blocks_x, 4, 4).transpose(0, 2, 1, 3)
+    image = image.reshape(blocks_y * 4, blocks_x * 4)
+    return image[:height, :width].tobytes()
+
+
+_DXT1_BLOCK = np.dtype([("color0", "<u2"), ("color1", "<u2"), ("bits", "<u4")])
+
+
+def _dxt1(data: bytes, width: int, height: int) -> bytes:
+    blocks = _blocks(data, width, height, _DXT1_BLOCK)
+    color0 = blocks["color0"]
+    color1 = blocks["color1"]
+
+    # The 4-entry palette of each block. Blocks with color0 <= color1 use the
+    # 3-colour mode, where the last entry is transparent black.
+    rgb0 = np.stack(_decode565(color0), axis=-1)
+    rgb1 = np.stack(_decode565(color1), axis=-1)
+    four_colour = (color0 > color1)[..., None]
+
+    palette = np.empty(blocks.shape + (4, 4), dtype=np.uint8)
+    palette[..., 0, :3] = rgb0
+    palette[..., 1, :3] = rgb1
+    palette[..., 2, :3] = np.where(four_colour, _c2a(rgb0, rgb1), _c2b(rgb0, rgb1))
+    palette[..., 3, :3] = np.where(four_colour, _c3(rgb0, rgb1), 0)
+    palette[..., :3, 3] = 0xFF
+    palette[..., 3, 3] = np.where(four_colour[..., 0], 0xFF, 0)
+
+    # Look up whole RGBA pixels at once by viewing each palette entry as a u32.
+    palette = palette.view(np.uint32)[..., 0]
+    indices = _indices(blocks["bits"], 2, 16)
+    return _pixels(np.take_along_axis(palette, indices, axis=2), width, height)
+
+
+_DXT5_BLOCK = np.dtype(
+    [
+        ("alpha0", "u1"),
+        ("alpha1", "u1"),
+        ("alpha_bits", "u1", (6,)),
+        ("color0", "<u2"),
+        ("color1", "<u2"),
+        ("bits", "<u4"),
+    ]
+)
+
+
+def _dxt5(data: bytes, width: int, height: int) -> bytes:
+    blocks = _blocks(data, width, height, _DXT5_BLOCK)
+
+    # The 8-entry alpha palette of each block. Blocks with alpha0 <= alpha1
+    # interpolate 4 values and add fully transparent and fully opaque entries.
+    alpha0 = blocks["alpha0"].astype(np.uint16)[..., None]
+    alpha1 = blocks["alpha1"].astype(np.uint16)[..., None]
+    steps = np.arange(2, 8, dtype=np.uint16)
+
+    eight_alpha = ((8 - steps) * alpha0 + (steps - 1) * alpha1) // 7
+    six_alpha = np.zeros_like(eight_alpha)
+    six_alpha[..., :4] = ((6 - steps[:4]) * alpha0 + (steps[:4] - 1) * alpha1) // 5
+    six_alpha[..., 5] = 0xFF
+
+    alphas = np.empty(blocks.shape + (8,), dtype=np.uint32)
+    alphas[..., 0:1] = alpha0
+    alphas[..., 1:2] = alpha1
+    alphas[..., 2:] = np.where(alpha0 > alpha1, eight_alpha, six_alpha)
+
+    # The 48 bits of 3-bit alpha indices, widened to a u64 per block.
+    alpha_bits = np.zeros(blocks.shape + (8,), dtype=np.uint8)
+    alpha_bits[..., :6] = blocks["alpha_bits"]
+    alpha_bits = alpha_bits.view("<u8")[..., 0]
+
+    # The colour palette always uses the 4-colour mode in DXT5.
+    rgb0 = np.stack(_decode565(blocks["color0"]), axis=-1)
+    rgb1 = np.stack(_decode565(blocks["color1"]), axis=-1)
+
+    palette = np.zeros(blocks.shape + (4, 4), dtype=np.uint8)
+    palette[..., 0, :3] = rgb0
+    palette[..., 1, :3] = rgb1
+    palette[..., 2, :3] = _c2a(rgb0, rgb1)
+    palette[..., 3, :3] = _c3(rgb0, rgb1)
+    palette = palette.view(np.uint32)[..., 0]
+
+    # Alpha goes in the top byte of each little-endian RGBA pixel.
+    colours = np.take_along_axis(palette, _indices(blocks["bits"], 2, 16), axis=2)
+    alphas = np.take_along_axis(alphas, _indices(alpha_bits, 3, 16), axis=2)
+    return _pixels(colours | alphas << 24, width, height)
 
 
 class DXT1Decoder(ImageFile.PyDecoder):
 
     def decode(self, buffer: bytes | Image.SupportsArrayInterface) -> tuple[int, int]:
         try:
-            self.set_as_raw(_dxt1(BytesIO(buffer), self.state.xsize, self.state.ysize))
-        except struct.error as e:
+            self.set_as_raw(_dxt1(buffer, self.state.xsize, self.state.ysize))
+        except ValueError as e:
             msg = "Truncated DDS file"
             raise OSError(msg) from e
         return -1, 0
@@ -148,8 +162,8 @@ class DXT5Decoder(ImageFile.PyDecoder):
 
     def decode(self, buffer: bytes | Image.SupportsArrayInterface) -> tuple[int, int]:
         try:
-            self.set_as_raw(_dxt5(BytesIO(buffer), self.state.xsize, self.state.ysize))
-        except struct.error as e:
+            self.set_as_raw(_dxt5(buffer, self.state.xsize, self.state.ysize))
+        except ValueError as e:
             msg = "Truncated DDS file"
             raise OSError(msg) from e
         return -1, 0
@@ -0,0 +1,153 @@
+import hashlib
+import io
+import os
+import numpy as np
+import struct
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+from .files.cache import DiskCache
+from .files.nu import NuTextureType
+
+# Texture decoding for the importer. Nothing here touches bpy, so it can run off
+# the main thread.
+
+
+def texture_key(texture, level):
+    # A hash identifying the decoded result of a texture: its payload, along
+    # with the header fields and mip level that decide how it's decoded.
+    digest = hashlib.sha256(texture.data)
+    digest.update(
+        "{}x{}x{}-{}-{}".format(
+            texture.width, texture.height, texture.levels, texture.type.name, level
+        ).encode("ascii")
+    )
+    return digest.hexdigest()
+
+
+# Whether Pillow has its C decoder for block-compressed data. Where it doesn't,
+# DXT1 and DXT5 payloads fall back to the decoders in plugins/DdsImagePlugin.py.
+HAS_BCN_DECODER = hasattr(Image.core, "bcn_decoder")
+
+# Arguments to Pillow's "bcn" decoder for each block-compressed texture type:
+# the BCn variant and the DDS pixel format.
+_BCN_ARGS = {NuTextureType.DXT1: (1, "DXT1"), NuTextureType.DXT5: (3, "DXT5")}
+
+
+def decode_texture(texture, level, use_bcn=HAS_BCN_DECODER):
+    # Decode one mip level of a texture to RGBA bytes, returned with its
+    # dimensions.
+    match texture.type:
+        case NuTextureType.DXT1:
+            decoder = "DXT1"
+        case NuTextureType.DXT5:
+            decoder = "DXT5"
+        case NuTextureType.DDS:
+            decoder = None
+
+    (width, height, data) = texture.level(level)
+
+    if decoder == None:
+        image = Image.open(io.BytesIO(data), formats=["DDS"])
+    elif use_bcn:
+        image = Image.frombytes(
+            "RGBA", (width, height), data, "bcn", _BCN_ARGS[texture.type]
+        )
+    else:
+        image = Image.frombytes("RGBA", (width, height), data, decoder)
+
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+
+    return (image.width, image.height, image.tobytes())
+
+
+# Byte to float conversion table, with the same values as byte / 255.0.
+_UNIT_FLOATS = np.arange(0x100, dtype=np.float32) / np.float32(0xFF)
+
+
+def float_pixels(pixels):
+    # RGBA bytes as the flat float32 array that Blender images hold, ready for
+    # pixels.foreach_set().
+    return _UNIT_FLOATS[np.frombuffer(pixels, dtype=np.uint8)]
+
+
+def decode_textures(textures, levels, keys, workers=0, cache=None, memory_limit=0):
+    # Decode textures on a pool of worker threads, yielding the results in
+    # order. Threads rather than processes, since Blender can't reliably spawn
+    # processes, and both the NumPy decoders and Pillow release the GIL for the
+    # bulk of the work. Each worker is given views of the scene data, not
+    # copies.
+    #
+    # Textures are submitted as a sliding window, so that decoded texture data
+    # stays under `memory_limit` bytes, if given. That counts the RGBA pixels
+    # of every texture in flight or waiting, and the texture being consumed
+    # twice over: its pixels, and the float32 copy made by float_pixels(),
+    # four times their size. Any texture in the window may be the next one
+    # consumed, so room is kept for the float copy of the largest. At least
+    # one texture is always in flight.
+    def decode(texture, level, key):
+        if cache is None:
+            return decode_texture(texture, level)
+
+        return cache.load(key, texture, level)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        pending = deque()
+        pending_size = 0
+
+        for texture, level, key in zip(textures, levels, keys):
+            (width, height) = texture.level_dimensions(level)
+            size = width * height * 4
+
+            while pending and memory_limit:
+                largest = max(size, max(future_size for _, future_size in pending))
+                if pending_size + size + largest * 4 <= memory_limit:
+                    break
+
+                (future, future_size) = pending.popleft()
+                pending_size -= future_size
+                yield future.result()
+
+            pending.append((executor.submit(decode, texture, level, key), size))
+            pending_size += size
+
+        while pending:
+            (future, _) = pending.popleft()
+            yield future.result()
+
+
+class TextureCache(DiskCache):
+    # Decoded textures, keyed by texture_key(), stored as a small header
+    # followed by the RGBA pixels. Entries are mapped on load, so a hit costs
+    # no decoding or copying.
+    HEADER = struct.Struct("<4sII")
+    MAGIC = b"TEXC"
+
+    # Bump whenever decoded output changes, to invalidate cached textures.
+    DECODER_VERSION = 2
+
+    def __init__(self, directory, max_size):
+        super().__init__(directory, max_size, suffix=".texcache")
+
+    def load(self, key, texture, level):
+        key = "{}-v{}".format(key, TextureCache.DECODER_VERSION)
+
+        value = self.get(key)
+        if value is not None and len(value) >= TextureCache.HEADER.size:
+            (magic, width, height) = TextureCache.HEADER.unpack_from(value, 0)
+            pixels = value[TextureCache.HEADER.size :]
+
+            if magic == TextureCache.MAGIC and len(pixels) == width * height * 4:
+                self.count(True)
+                return (width, height, pixels)
+
+        # A missing or unusable entry is a miss, and is replaced.
+        self.count(False)
+
+        (width, height, pixels) = decode_texture(texture, level)
+        header = TextureCache.HEADER.pack(TextureCache.MAGIC, width, height)
+        self.put(key, [header, pixels])
+
+        return (width, height, pixels)